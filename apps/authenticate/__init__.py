@@ -6,24 +6,79 @@
 
 """
 
+from collections import Counter
+from typing import Any, Optional
 from aiohttp import web
 
+from utils.cache import TTLCache, BoundedIntSet
+from utils.executors import MeteredExecutor
+from apps.authenticate.tables import REFRESH_TOKEN_LIVING_TIME
+from apps.authenticate.sweeper import RefreshTokenSweeper
+
 from .routes import init_routes
 
+AUTH_EVENTS = ('logins', 'login_failures', 'refreshes', 'refresh_failures', 'logouts', 'logouts_all')
+
+
+async def start_app_authenticate(app_authenticate: web.Application) -> None:
+    if app_authenticate['sweeper'] is not None:
+        app_authenticate['sweeper'].start()
+
+
+async def deinit_app_authenticate(app_authenticate: web.Application) -> None:
+    if app_authenticate['sweeper'] is not None:
+        await app_authenticate['sweeper'].stop()
+
+    for key in ('password_executor', 'signing_executor'):
+        if app_authenticate[key] is not None:
+            app_authenticate[key].shutdown(wait=False)
+
 
 def init_app_authenticate(*, app: web.Application,
                           living_time: int,
-                          private_key: bytes) -> None:
+                          private_key: Any,
+                          algorithm: str = 'RS256',
+                          password_executor: Optional[MeteredExecutor] = None,
+                          signing_executor: Optional[MeteredExecutor] = None,
+                          token_cache: Optional[TTLCache] = None,
+                          revoked_tokens: Optional[BoundedIntSet] = None,
+                          refresh_living_time: Optional[int] = None,
+                          max_sessions: Optional[int] = None,
+                          refresh_from_replica: bool = False,
+                          sweeper: Optional[RefreshTokenSweeper] = None) -> None:
     """
     Init and returns sub app for accounts
     :param app: main web.Application object
     :param living_time: living token time
-    :param private_key: private key for signature JWT
+    :param private_key: private key for signature JWT (see utils.load_private_key)
+    :param algorithm: JWT algorithm, has to fit private key
+    :param password_executor: pool for hashing passwords, if None hashing runs in event loop
+    :param signing_executor: pool for signing JWT, if None signing runs in event loop
+    :param token_cache: cache of existing refresh tokens, if None each refresh checks database
+    :param revoked_tokens: ids of deleted refresh tokens, they are rejected without query
+    :param refresh_living_time: living refresh token time, if None default one is used
+    :param max_sessions: max count of refresh tokens of one user, if None there is no limit
+    :param refresh_from_replica: look for refresh token on replica first,
+        token deleted on primary is accepted until deleting is replicated
+    :param sweeper: background deleting of expired refresh tokens, it runs while app is running
     :return:
     """
     app_authenticate = web.Application()
     app_authenticate['living_time'] = living_time
     app_authenticate['private_key'] = private_key
+    app_authenticate['algorithm'] = algorithm
+    app_authenticate['password_executor'] = password_executor
+    app_authenticate['signing_executor'] = signing_executor
+    app_authenticate['token_cache'] = token_cache
+    app_authenticate['revoked_tokens'] = revoked_tokens
+    app_authenticate['refresh_living_time'] = refresh_living_time or REFRESH_TOKEN_LIVING_TIME
+    app_authenticate['max_sessions'] = max_sessions
+    app_authenticate['refresh_from_replica'] = refresh_from_replica
+    app_authenticate['sweeper'] = sweeper
+    # counters of logins, refreshes, failures etc, all of them are exposed from the start
+    app_authenticate['counters'] = Counter(dict.fromkeys(AUTH_EVENTS, 0))
+    app_authenticate.on_startup.append(start_app_authenticate)
+    app_authenticate.on_cleanup.append(deinit_app_authenticate)
 
     init_routes(app_authenticate)
 
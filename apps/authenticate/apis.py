@@ -9,8 +9,10 @@
 from aiohttp import web, web_exceptions
 from aiohttp_jwt_auth.mixins import JWTAuthMixin
 
+from utils import exceptions as app_exceptions
+from utils.codec import json_response, read_json_body
 from apps.authenticate import exceptions as auth_exceptions
-from apps.authenticate.services import login, refresh_token, logout
+from apps.authenticate.services import login, refresh_token, logout, logout_all
 
 
 class Login(web.View):
@@ -36,20 +38,37 @@ class Login(web.View):
             "401":
                 description: invalid credentials. See details in answer JSON {"error": description}
         """
-        try:
-            credentials = await self.request.json()
-        except ValueError:
-            raise auth_exceptions.AuthenticateNoCredentials
-
         db = self.request.config_dict['db']
         app_authenticate = self.request.config_dict['authenticate']
+        counters = app_authenticate['counters']
 
-        access_token = await login(db=db,
-                                   credentials_data=credentials,
-                                   living_time=app_authenticate['living_time'],
-                                   private_key=app_authenticate['private_key'])
+        try:
+            credentials = await read_json_body(self.request)
+        except ValueError:
+            counters['login_failures'] += 1
+            raise auth_exceptions.AuthenticateNoCredentials
+        except app_exceptions.ExceptionEx:  # body is too large
+            counters['login_failures'] += 1
+            raise
 
-        return web.json_response({
+        try:
+            access_token = await login(db=db,
+                                       credentials_data=credentials,
+                                       living_time=app_authenticate['living_time'],
+                                       private_key=app_authenticate['private_key'],
+                                       algorithm=app_authenticate['algorithm'],
+                                       password_executor=app_authenticate['password_executor'],
+                                       signing_executor=app_authenticate['signing_executor'],
+                                       token_cache=app_authenticate['token_cache'],
+                                       refresh_living_time=app_authenticate['refresh_living_time'],
+                                       max_sessions=app_authenticate['max_sessions'],
+                                       revoked_tokens=app_authenticate['revoked_tokens'])
+        except app_exceptions.ExceptionEx:  # invalid credentials, validation errors etc
+            counters['login_failures'] += 1
+            raise
+        counters['logins'] += 1
+
+        return json_response(self.request, {
             'token': access_token
         })
 
@@ -83,12 +102,24 @@ class RefreshToken(JWTAuthMixin, web.View):
         """
         db = self.request.config_dict['db']
         app_authenticate = self.request.config_dict['authenticate']
+        counters = app_authenticate['counters']
 
-        access_token = await refresh_token(db=db,
-                                           user_data_token=self.request['user'],
-                                           living_time=app_authenticate['living_time'],
-                                           private_key=app_authenticate['private_key'])
-        return web.json_response({
+        try:
+            access_token = await refresh_token(db=db,
+                                               user_data_token=self.request['user'],
+                                               living_time=app_authenticate['living_time'],
+                                               private_key=app_authenticate['private_key'],
+                                               algorithm=app_authenticate['algorithm'],
+                                               signing_executor=app_authenticate['signing_executor'],
+                                               token_cache=app_authenticate['token_cache'],
+                                               revoked_tokens=app_authenticate['revoked_tokens'],
+                                               from_replica=app_authenticate['refresh_from_replica'])
+        except app_exceptions.ExceptionEx:
+            counters['refresh_failures'] += 1
+            raise
+        counters['refreshes'] += 1
+
+        return json_response(self.request, {
             'token': access_token
         })
 
@@ -119,8 +150,49 @@ class Logout(JWTAuthMixin, web.View):
         """
 
         db = self.request.config_dict['db']
+        app_authenticate = self.request.config_dict['authenticate']
 
         await logout(db=db,
-                     user_data_token=self.request['user'])
+                     user_data_token=self.request['user'],
+                     token_cache=app_authenticate['token_cache'],
+                     revoked_tokens=app_authenticate['revoked_tokens'])
+        app_authenticate['counters']['logouts'] += 1
+
+        return json_response(self.request, {})
+
+
+########################################################
+
+class LogoutAll(JWTAuthMixin, web.View):
+    """
+    Endpoint logout from all sessions
+    Steps for logout user:
+    1. Delete all user's refresh tokens form database
+    Without refresh token user cannot do refresh
+    """
+
+    async def post(self) -> web.Response:
+        """
+        ---
+        description: This end-point for logout user from all sessions (all devices).
+        tags:
+        - Identity service
+        produces:
+        - application/json
+        responses:
+            "200":
+                description: successful operation. Return nothing.
+            "401":
+                description: invalid access token in header or its may be expired.
+        """
+
+        db = self.request.config_dict['db']
+        app_authenticate = self.request.config_dict['authenticate']
+
+        await logout_all(db=db,
+                         user_data_token=self.request['user'],
+                         token_cache=app_authenticate['token_cache'],
+                         revoked_tokens=app_authenticate['revoked_tokens'])
+        app_authenticate['counters']['logouts_all'] += 1
 
-        return web.json_response({})
+        return json_response(self.request, {})
@@ -7,23 +7,81 @@
 """
 
 import logging
+import psycopg2
 import trafaret as t
-from typing import Union
-from aiopg.sa.engine import Engine
+from datetime import timedelta
+from typing import Any, Union, Optional
+from sqlalchemy import sql
 from aiopg.sa.connection import SAConnection
 
 from aiohttp_jwt_auth.structs import UserDataToken
 
 from utils import exceptions as app_exceptions
-from utils.db import get_one_object, create_objects, delete_objects
+from utils.cache import TTLCache, BoundedIntSet
+from utils.db import DbRouter, get_one_object, create_objects, delete_objects, \
+    CompiledQuery, PreparedQuery
+from utils.executors import MeteredExecutor, run_in_executor
 from utils.validate import validate
-from utils.timestamp import get_current_timestamp
+from utils.timestamp import get_current_timestamp, get_current_datetime
 from apps.authenticate import exceptions as auth_exceptions
 from apps.authenticate.utils import generate_password_hash, validate_password, encode_token
-from apps.authenticate.tables import users, User, refresh_tokens, RefreshToken, to_user_data_token
+from apps.authenticate.tables import users, User, refresh_tokens, RefreshToken, to_user_data_token, \
+    REFRESH_TOKEN_LIVING_TIME
 
 logger = logging.getLogger(__name__)
 
+# hot queries of login, refresh and logout.
+# They are prepared on server once for each connection
+_select_user_by_username = PreparedQuery(
+    name='auth_select_user_by_username',
+    query=sql.select([users]).where(users.c.username == sql.bindparam('username')).limit(1)
+)
+_insert_refresh_token = PreparedQuery(
+    name='auth_insert_refresh_token',
+    query=refresh_tokens.insert()
+                        .values(user_id=sql.bindparam('owner_id'),
+                                expires_at=sql.bindparam('token_expires_at'))
+                        .returning(refresh_tokens)
+)
+_select_refresh_token_by_id = PreparedQuery(
+    name='auth_select_refresh_token_by_id',
+    query=sql.select([refresh_tokens]).where(refresh_tokens.c.id == sql.bindparam('token_id'))
+)
+_delete_refresh_token_by_id = PreparedQuery(
+    name='auth_delete_refresh_token_by_id',
+    query=refresh_tokens.delete()
+                        .where(refresh_tokens.c.id == sql.bindparam('token_id'))
+                        .returning(refresh_tokens)
+)
+# tokens older than the newest "keep" ones. If user has no more than "keep" tokens
+# subquery is NULL and nothing is scanned for deleting, so it is cheap on each login
+_evict_refresh_tokens = PreparedQuery(
+    name='auth_evict_refresh_tokens',
+    query=refresh_tokens.delete()
+                        .where(refresh_tokens.c.user_id == sql.bindparam('owner_id'))
+                        .where(refresh_tokens.c.id <= (
+                            sql.select([refresh_tokens.c.id])
+                               .where(refresh_tokens.c.user_id == sql.bindparam('owner_id'))
+                               .order_by(refresh_tokens.c.id.desc())
+                               .offset(sql.bindparam('keep'))
+                               .limit(1)
+                               .as_scalar()
+                        ))
+                        .returning(refresh_tokens.c.id)
+)
+
+# sweeper of expired tokens
+_delete_expired_refresh_tokens = CompiledQuery(
+    refresh_tokens.delete()
+                  .where(refresh_tokens.c.id.in_(
+                      sql.select([refresh_tokens.c.id])
+                         .where(refresh_tokens.c.expires_at <= sql.func.now())
+                         .order_by(refresh_tokens.c.expires_at)
+                         .limit(sql.bindparam('batch_size'))
+                         .with_for_update(skip_locked=True)
+                  ))
+)
+
 
 ########################################################
 # funcs for main user operations
@@ -31,11 +89,13 @@ logger = logging.getLogger(__name__)
 
 async def create_user(*,
                       conn: SAConnection,
-                      user_data: dict) -> User:
+                      user_data: dict,
+                      password_executor: Optional[MeteredExecutor] = None) -> User:
     """
     Create user object in database
     :param conn: connector to database
     :param user_data: dict with user data
+    :param password_executor: pool for hashing password
     :return:
     """
     user_format = t.Dict({
@@ -44,7 +104,9 @@ async def create_user(*,
     })
 
     user_data = validate(data_to_check=user_data, trafaret_format=user_format)
-    user_data['password'] = generate_password_hash(password=user_data['password'])
+    user_data['password'] = await run_in_executor(password_executor,
+                                                  generate_password_hash,
+                                                  password=user_data['password'])
 
     user = await create_objects(conn=conn,
                                 table=users,
@@ -74,21 +136,27 @@ async def get_user(*,
 
 async def create_refresh_token(*,
                                conn: SAConnection,
-                               user: User) -> RefreshToken:
+                               user: User,
+                               living_time: int = REFRESH_TOKEN_LIVING_TIME,
+                               token_cache: Optional[TTLCache] = None) -> RefreshToken:
     """
     Create refresh token in database
     :param conn: connection to database
     :param user: user owner refresh token
+    :param living_time: refresh token's living time (in sec.)
+    :param token_cache: cache of existing refresh tokens, new token is put into it
     :return:
     """
-    refresh_token_data = {
-        'user_id': user['id']
-    }
-    refresh_token = await create_objects(conn=conn,
-                                         table=refresh_tokens,
-                                         data=refresh_token_data)
+    expires_at = get_current_datetime() + timedelta(seconds=living_time)
+    cursor = await _insert_refresh_token.execute(conn,
+                                                 owner_id=user['id'],
+                                                 token_expires_at=expires_at)
+    refresh_token = RefreshToken(await cursor.fetchone())  # type: ignore
+
+    if token_cache is not None:
+        token_cache.set(refresh_token['id'], refresh_token)
 
-    return RefreshToken(refresh_token[0])  # type: ignore
+    return refresh_token
 
 
 ########################################################
@@ -104,7 +172,14 @@ async def get_refresh_token(*,
     :param user_id: for where clause
     :return:
     """
-    refresh_token = await get_one_object(conn=conn, table=refresh_tokens, where=kwargs)
+    if kwargs.keys() == {'id'}:
+        # the hottest lookup, by primary key
+        cursor = await _select_refresh_token_by_id.execute(conn, token_id=kwargs['id'])
+        refresh_token = await cursor.fetchone()
+        if refresh_token is None:
+            raise app_exceptions.DoesNotExist
+    else:
+        refresh_token = await get_one_object(conn=conn, table=refresh_tokens, where=kwargs)
     return RefreshToken(refresh_token)  # type: ignore
 
 
@@ -112,20 +187,80 @@ async def get_refresh_token(*,
 
 async def delete_refresh_token(*,
                                conn: SAConnection,
+                               token_cache: Optional[TTLCache] = None,
+                               revoked_tokens: Optional[BoundedIntSet] = None,
                                **kwargs: Union[int, str]) -> None:
     """
     Delete refresh token from database
     :param conn:
+    :param token_cache: cache of existing refresh tokens, deleted tokens are dropped from it
+    :param revoked_tokens: ids of deleted refresh tokens, deleted tokens are added to it
     :param id:
     :param user_id:
     :return:
     """
-    refresh_token = await delete_objects(conn=conn,
-                                         table=refresh_tokens,
-                                         query=kwargs)
+    if kwargs.keys() == {'id'}:
+        cursor = await _delete_refresh_token_by_id.execute(conn, token_id=kwargs['id'])
+        refresh_token = await cursor.fetchall()
+    else:
+        refresh_token = await delete_objects(conn=conn,
+                                             table=refresh_tokens,
+                                             query=kwargs)
     if not refresh_token:
         raise app_exceptions.DoesNotExist
 
+    for row in refresh_token:
+        if token_cache is not None:
+            token_cache.delete(row['id'])
+        if revoked_tokens is not None:
+            revoked_tokens.add(row['id'])
+
+
+########################################################
+
+async def evict_refresh_tokens(*,
+                               conn: SAConnection,
+                               user: User,
+                               keep: int,
+                               token_cache: Optional[TTLCache] = None,
+                               revoked_tokens: Optional[BoundedIntSet] = None) -> int:
+    """
+    Delete the oldest refresh tokens of user by one statement, the newest ones are kept.
+    It reads only tokens of the user (index on user_id), their count is at most keep + 1 on login
+    :param conn: connection to database
+    :param user: user owner refresh tokens
+    :param keep: count of the newest tokens to keep
+    :param token_cache: cache of existing refresh tokens, deleted tokens are dropped from it
+    :param revoked_tokens: ids of deleted refresh tokens, deleted tokens are added to it
+    :return: count of deleted tokens
+    """
+    cursor = await _evict_refresh_tokens.execute(conn, owner_id=user['id'], keep=keep)
+    evicted = await cursor.fetchall()
+
+    for row in evicted:
+        if token_cache is not None:
+            token_cache.delete(row['id'])
+        if revoked_tokens is not None:
+            revoked_tokens.add(row['id'])
+
+    return len(evicted)
+
+
+########################################################
+
+async def delete_expired_refresh_tokens(*,
+                                        conn: SAConnection,
+                                        batch_size: int) -> int:
+    """
+    Delete one batch of expired refresh tokens.
+    Rows locked by other transactions are skipped, so few sweepers do not block each other
+    :param conn: connection to database
+    :param batch_size: max count of tokens to delete
+    :return: count of deleted tokens
+    """
+    cursor = await _delete_expired_refresh_tokens.execute(conn, batch_size=batch_size)
+    return cursor.rowcount
+
 
 ########################################################
 # logic funcs
@@ -133,11 +268,13 @@ async def delete_refresh_token(*,
 
 async def identity_user(*,
                         conn: SAConnection,
-                        credentials_data: dict) -> User:
+                        credentials_data: dict,
+                        password_executor: Optional[MeteredExecutor] = None) -> User:
     """
     Check if user exist in database
     :param conn: connection to database
     :param credentials_data: dict user credentials
+    :param password_executor: pool for password verification
     :return: dict with user data
     """
     credentials_format = t.Dict({
@@ -151,16 +288,17 @@ async def identity_user(*,
     except app_exceptions.ValidateDataError:
         raise auth_exceptions.AuthenticateNoCredentials
 
-    # look for user in database
-    try:
-        user = await get_user(conn=conn,
-                              username=credentials_data['username'])
-    except app_exceptions.DoesNotExist:
+    # look for user in database, username is unique so it is one row at most
+    cursor = await _select_user_by_username.execute(conn, username=str(credentials_data['username']))
+    user = await cursor.fetchone()
+    if user is None:
         raise auth_exceptions.AuthenticateErrorCredentials
 
     # check user password
-    if not validate_password(password=credentials_data['password'],
-                             password_hash=user['password']):
+    if not await run_in_executor(password_executor,
+                                 validate_password,
+                                 password=credentials_data['password'],
+                                 password_hash=user['password']):
         raise auth_exceptions.AuthenticateErrorCredentials
 
     return User(user)  # type: ignore
@@ -172,19 +310,26 @@ async def create_access_token(*,
                               user_data_token: UserDataToken,
                               refresh_token: RefreshToken,
                               living_time: int,
-                              private_key: str) -> str:
+                              private_key: Any,
+                              algorithm: str = 'RS256',
+                              signing_executor: Optional[MeteredExecutor] = None) -> str:
     """
     Generate access token and return it
     :param user_data_token: user data token object
     :param refresh_token: refresh token object
     :param living_time: token's living time (in sec.)
     :param private_key: private key for signature JWT
+    :param algorithm: JWT algorithm
+    :param signing_executor: pool for signing JWT
     :return:
     """
     user_data_token.jti = refresh_token['id']
     user_data_token.exp = get_current_timestamp() + living_time
-    return encode_token(user_data_token=user_data_token,
-                        private_key=private_key)
+    return await run_in_executor(signing_executor,
+                                 encode_token,
+                                 user_data_token=user_data_token,
+                                 private_key=private_key,
+                                 algorithm=algorithm)
 
 
 ########################################################
@@ -192,82 +337,203 @@ async def create_access_token(*,
 ########################################################
 
 async def login(*,
-                db: Engine,
+                db: DbRouter,
                 credentials_data: dict,
                 living_time: int,
-                private_key: str) -> str:
+                private_key: Any,
+                algorithm: str = 'RS256',
+                password_executor: Optional[MeteredExecutor] = None,
+                signing_executor: Optional[MeteredExecutor] = None,
+                token_cache: Optional[TTLCache] = None,
+                refresh_living_time: int = REFRESH_TOKEN_LIVING_TIME,
+                max_sessions: Optional[int] = None,
+                revoked_tokens: Optional[BoundedIntSet] = None) -> str:
     """
     Steps for authenticate user:
     1. check its credentials, by login and password, exists in database etc
-    2. create refresh token
+    2. create refresh token, the oldest user's tokens over limit of sessions are deleted
     3. create access token with link to refresh token
         link for refresh token needs to a later refresh and logout
+    Password is checked between reading user and creating refresh token,
+    so it takes two prepared statements on the same connection
     :param db: database engine
     :param credentials_data: dict user credentials
     :param living_time: token's living time (in sec.)
     :param private_key: private key for signature JWT
+    :param algorithm: JWT algorithm
+    :param password_executor: pool for password verification
+    :param signing_executor: pool for signing JWT
+    :param token_cache: cache of existing refresh tokens
+    :param refresh_living_time: refresh token's living time (in sec.)
+    :param max_sessions: max count of refresh tokens of one user, if None there is no limit
+    :param revoked_tokens: ids of deleted refresh tokens
     :return: JWT for user
     """
     async with db.acquire() as conn:  # type: SAConnection
         user = await identity_user(conn=conn,
-                                   credentials_data=credentials_data)
+                                   credentials_data=credentials_data,
+                                   password_executor=password_executor)
 
         refresh_token = await create_refresh_token(conn=conn,
-                                                   user=user)
-
-        user_data_token = to_user_data_token(user)
-        token = await create_access_token(user_data_token=user_data_token,
-                                          refresh_token=refresh_token,
-                                          living_time=living_time,
-                                          private_key=private_key)
-        return token
+                                                   user=user,
+                                                   living_time=refresh_living_time,
+                                                   token_cache=token_cache)
+
+        if max_sessions is not None:
+            await evict_refresh_tokens(conn=conn,
+                                       user=user,
+                                       keep=max_sessions,
+                                       token_cache=token_cache,
+                                       revoked_tokens=revoked_tokens)
+
+    # connection is released before signing
+    user_data_token = to_user_data_token(user)
+    token = await create_access_token(user_data_token=user_data_token,
+                                      refresh_token=refresh_token,
+                                      living_time=living_time,
+                                      private_key=private_key,
+                                      algorithm=algorithm,
+                                      signing_executor=signing_executor)
+    return token
 
 
 ########################################################
 
 async def refresh_token(*,
-                        db: Engine,
+                        db: DbRouter,
                         user_data_token: UserDataToken,
                         living_time: int,
-                        private_key: str) -> str:
+                        private_key: Any,
+                        algorithm: str = 'RS256',
+                        signing_executor: Optional[MeteredExecutor] = None,
+                        token_cache: Optional[TTLCache] = None,
+                        revoked_tokens: Optional[BoundedIntSet] = None,
+                        from_replica: bool = False) -> str:
     """
     Steps for refresh token:
-    1. Check does refresh token exist in database
+    1. Check does refresh token exist: it is not revoked,
+        then look for it in cache or in database and it is not expired
     2. Update exp time in access token
     3. Send access token back
+    NOTE THAT token deleted by other process is found in cache until its ttl is expired
     :param db: database engine
     :param user_data_token: UserDataToken object received from Auth header
+    :param algorithm: JWT algorithm
+    :param signing_executor: pool for signing JWT
+    :param token_cache: cache of existing refresh tokens
+    :param revoked_tokens: ids of deleted refresh tokens
+    :param from_replica: look for refresh token on replica first, see _get_refresh_token_for_refresh
     :return:
     """
-    async with db.acquire() as conn:  # type: SAConnection
+    if revoked_tokens is not None and user_data_token.jti in revoked_tokens:
+        raise auth_exceptions.AuthenticateErrorRefreshToken
+
+    refresh_token = None
+    if token_cache is not None:
+        refresh_token = token_cache.get(user_data_token.jti)
+
+    if refresh_token is None:
+        try:
+            refresh_token = await _get_refresh_token_for_refresh(db=db,
+                                                                 jti=user_data_token.jti,
+                                                                 from_replica=from_replica)
+        except auth_exceptions.AuthenticateErrorRefreshToken:
+            # token was deleted (e.g. by other process), next time it is rejected without query
+            if revoked_tokens is not None:
+                revoked_tokens.add(user_data_token.jti)
+            raise
+
+        if token_cache is not None:
+            token_cache.set(refresh_token['id'], refresh_token)
+
+    if refresh_token['expires_at'] <= get_current_datetime():
+        raise auth_exceptions.AuthenticateErrorRefreshToken
+
+    token = await create_access_token(user_data_token=user_data_token,
+                                      refresh_token=refresh_token,
+                                      living_time=living_time,
+                                      private_key=private_key,
+                                      algorithm=algorithm,
+                                      signing_executor=signing_executor)
+
+    return token
+
+
+async def _get_refresh_token_for_refresh(*,
+                                         db: DbRouter,
+                                         jti: int,
+                                         from_replica: bool = False) -> RefreshToken:
+    """
+    Look for refresh token by its id on primary.
+    With from_replica replica is checked first and primary only if token is not found there
+    (it could be created just now) or query on replica fails.
+    NOTE THAT replica lags behind primary: token deleted by logout on other process
+    is accepted by replica until deleting is replicated
+    """
+    refresh_token = None
+    if from_replica and db.has_replicas:
         try:
-            refresh_token = await get_refresh_token(conn=conn,
-                                                    id=user_data_token.jti)
+            async with db.acquire_read() as conn:  # type: SAConnection
+                refresh_token = await get_refresh_token(conn=conn,
+                                                        id=jti)
         except app_exceptions.DoesNotExist:
-            raise auth_exceptions.AuthenticateErrorRefreshToken
+            pass
+        except psycopg2.OperationalError as exc:
+            # connection is lost, query is cancelled due to recovery conflict etc
+            logger.warning(f'Cannot get refresh token from replica: {exc}')
 
-        token = await create_access_token(user_data_token=user_data_token,
-                                          refresh_token=refresh_token,
-                                          living_time=living_time,
-                                          private_key=private_key)
+    if refresh_token is None:
+        async with db.acquire() as conn:  # type: SAConnection
+            try:
+                refresh_token = await get_refresh_token(conn=conn,
+                                                        id=jti)
+            except app_exceptions.DoesNotExist:
+                raise auth_exceptions.AuthenticateErrorRefreshToken
 
-    return token
+    return refresh_token
 
 
 ########################################################
 
 async def logout(*,
-                 db: Engine,
-                 user_data_token: UserDataToken) -> None:
+                 db: DbRouter,
+                 user_data_token: UserDataToken,
+                 token_cache: Optional[TTLCache] = None,
+                 revoked_tokens: Optional[BoundedIntSet] = None) -> None:
     """
     Steps for logout user:
-    1. Delete refresh token form database
+    1. Delete refresh token form database (and from cache), mark it as revoked
     Without refresh token user cannot do refresh
     """
     async with db.acquire() as conn:  # type: SAConnection
         try:
             await delete_refresh_token(conn=conn,
+                                       token_cache=token_cache,
+                                       revoked_tokens=revoked_tokens,
                                        id=user_data_token.jti)
         except app_exceptions.DoesNotExist:
             logger.debug(f'Logout: Refresh token does not exist')
             raise auth_exceptions.AuthenticateErrorRefreshToken
+
+
+########################################################
+
+async def logout_all(*,
+                     db: DbRouter,
+                     user_data_token: UserDataToken,
+                     token_cache: Optional[TTLCache] = None,
+                     revoked_tokens: Optional[BoundedIntSet] = None) -> None:
+    """
+    Steps for logout user from all sessions:
+    1. Delete all user's refresh tokens from database by one statement
+        (and from cache), mark them as revoked
+    """
+    async with db.acquire() as conn:  # type: SAConnection
+        try:
+            await delete_refresh_token(conn=conn,
+                                       token_cache=token_cache,
+                                       revoked_tokens=revoked_tokens,
+                                       user_id=user_data_token.sub)
+        except app_exceptions.DoesNotExist:
+            logger.debug(f'Logout all: Refresh tokens do not exist')
+            raise auth_exceptions.AuthenticateErrorRefreshToken
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+    sweeper
+    ~~~~~~~~~~~~~~~
+  
+    Background deleting of expired refresh tokens
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiopg.sa.connection import SAConnection
+
+from utils.db import DbRouter
+from utils.metrics import Histogram
+from apps.authenticate.services import delete_expired_refresh_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenSweeper:
+    """
+    Deletes expired refresh tokens in small batches.
+    Each batch is a short transaction and there is a pause between batches,
+    so sweeping does not compete with login/refresh for database
+    """
+
+    def __init__(self, *,
+                 db: DbRouter,
+                 interval: float = 60.0,
+                 batch_size: int = 1000,
+                 batch_pause: float = 0.1) -> None:
+        """
+        :param db: database engine
+        :param interval: time (in sec.) between sweeps
+        :param batch_size: max count of tokens deleted by one statement
+        :param batch_pause: time (in sec.) between batches of one sweep
+        """
+        self._db = db
+        self._interval = interval
+        self._batch_size = batch_size
+        self._batch_pause = batch_pause
+        self._task: Optional[asyncio.Task] = None
+
+        # progress
+        self._runs: int = 0
+        self._batches: int = 0
+        self._deleted_total: int = 0
+        self._last_run_deleted: int = 0
+        self._last_run_at: Optional[float] = None
+        self._batch_time = Histogram()
+
+    ########################################################
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def sweep(self) -> int:
+        """
+        Delete all expired tokens, batch by batch
+        :return: count of deleted tokens
+        """
+        self._last_run_deleted = 0
+        while True:
+            started = time.monotonic()
+            async with self._db.acquire() as conn:  # type: SAConnection
+                deleted = await delete_expired_refresh_tokens(conn=conn,
+                                                              batch_size=self._batch_size)
+            self._batch_time.observe(time.monotonic() - started)
+
+            self._batches += 1
+            self._last_run_deleted += deleted
+            self._deleted_total += deleted
+
+            if deleted < self._batch_size:
+                break
+
+            await asyncio.sleep(self._batch_pause)
+
+        self._runs += 1
+        self._last_run_at = time.time()
+        if self._last_run_deleted:
+            logger.info(f'Sweeper: deleted {self._last_run_deleted} expired refresh tokens')
+
+        return self._last_run_deleted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception(f'Sweeper: error while deleting expired refresh tokens: {exc}')
+
+            await asyncio.sleep(self._interval)
+
+    ########################################################
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def stats(self) -> dict:
+        """
+        Progress of sweeping
+        """
+        return {
+            'runs': self._runs,
+            'batches': self._batches,
+            'deleted_total': self._deleted_total,
+            'last_run_deleted': self._last_run_deleted,
+            'last_run_at': self._last_run_at,
+            'batch_time': self._batch_time.snapshot()
+        }
@@ -7,6 +7,7 @@
 """
 
 import sqlalchemy as sa
+from datetime import datetime
 from sqlalchemy import MetaData
 
 try:
@@ -42,13 +43,24 @@ def to_user_data_token(user: User) -> UserDataToken:
 
 ##################################################
 
+# default living time of refresh token (in sec.)
+REFRESH_TOKEN_LIVING_TIME: int = 30 * 24 * 60 * 60
+
 refresh_tokens = sa.Table(
     'refresh_tokens', metadata,
     sa.Column('id', sa.Integer, primary_key=True),
-    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False)
+    # tokens are looked for by user on login (limit of sessions) and on logout from all sessions
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False, index=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False,
+              server_default=sa.func.now()),
+    # expired tokens are deleted by background sweeper
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False, index=True,
+              server_default=sa.text(f"now() + interval '{REFRESH_TOKEN_LIVING_TIME} seconds'"))
 )
 
 
 class RefreshToken(TypedDict):
     id: int
     user_id: int
+    created_at: datetime
+    expires_at: datetime
@@ -48,6 +48,17 @@ async def test_login_fail_error_no_credentials(app: web.Application, database,
     assert res.status == web_exceptions.HTTPUnauthorized.status_code
 
 
+async def test_login_fail_body_too_large(app: web.Application, database, api_client):
+    app_authenticate = app['authenticate']
+    url = app_authenticate.router['login'].url_for()
+
+    res = await api_client.post(url, data=b'x' * (app['max_json_body_size'] + 1),
+                                headers={'Content-Type': 'application/json'})
+
+    assert res.status == web_exceptions.HTTPRequestEntityTooLarge.status_code
+    assert app_authenticate['counters']['login_failures'] == 1
+
+
 async def test_login_success(app: web.Application, database, get_user_data, api_client):
     app_authenticate = app['authenticate']
     user_data = get_user_data()
@@ -116,3 +127,25 @@ async def test_logout_success(app: web.Application, database, get_user_data, api
     header = {'Authorization': f'{app["config"]["authorized"]["jwt_header_prefix"]} {token}'}
     res = await api_client.post(url_logout, headers=header)
     assert res.status == web_exceptions.HTTPOk.status_code
+
+
+async def test_logout_all_success(app: web.Application, database, get_user_data, api_client):
+    app_authenticate = app['authenticate']
+    user_data = get_user_data()
+    url_login = app_authenticate.router['login'].url_for()
+    url_logout_all = app_authenticate.router['logout-all'].url_for()
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        await create_user(conn=conn, user_data=user_data)
+
+    res = await api_client.post(url_login, json={
+        'username': user_data['username'],
+        'password': user_data['password']
+    })
+
+    answer = await res.json()
+    token = answer.get('token')
+
+    header = {'Authorization': f'{app["config"]["authorized"]["jwt_header_prefix"]} {token}'}
+    res = await api_client.post(url_logout_all, headers=header)
+    assert res.status == web_exceptions.HTTPOk.status_code
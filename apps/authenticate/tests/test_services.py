@@ -16,12 +16,13 @@ from aiohttp_jwt_auth.consts import JWT_AUTH_APP, JWT_PUBLIC_KEY
 from aiohttp_jwt_auth.utils import validate_token
 
 from utils import exceptions as app_exceptions
+from utils.cache import TTLCache, BoundedIntSet
 from utils.timestamp import get_current_timestamp
 from apps.authenticate import exceptions as auth_exceptions
 from apps.authenticate.tables import users, refresh_tokens, to_user_data_token
 from apps.authenticate.services import create_user, get_user, identity_user, \
-    create_refresh_token, get_refresh_token, delete_refresh_token, \
-    create_access_token, login, refresh_token, logout
+    create_refresh_token, get_refresh_token, delete_refresh_token, evict_refresh_tokens, \
+    create_access_token, login, refresh_token, logout, logout_all
 
 
 ########################################################
@@ -356,6 +357,44 @@ async def test_refresh_token_fail_error_refresh_token(app, database, faker):
                             private_key=app_authenticate['private_key'])
 
 
+async def test_refresh_token_with_token_cache(app, database, get_user_data):
+    app_authenticate = app['authenticate']
+    app_authorized = app[JWT_AUTH_APP]
+    token_cache = TTLCache(max_size=10, ttl=60)
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user_data = get_user_data()
+        await create_user(conn=conn, user_data=user_data)
+
+    token = await login(db=app['db'],
+                        credentials_data={'username': user_data['username'],
+                                          'password': user_data['password']},
+                        living_time=app_authenticate['living_time'],
+                        private_key=app_authenticate['private_key'],
+                        token_cache=token_cache)
+
+    token_encoded = validate_token(token=token, public_key=app_authorized[JWT_PUBLIC_KEY])
+    assert token_encoded.jti in token_cache
+
+    # token is deleted by other process: cache still accepts it until ttl is expired
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        await delete_refresh_token(conn=conn, id=token_encoded.jti)
+
+    await refresh_token(db=app['db'],
+                        user_data_token=token_encoded,
+                        living_time=app_authenticate['living_time'],
+                        private_key=app_authenticate['private_key'],
+                        token_cache=token_cache)
+
+    token_cache.clear()
+    with pytest.raises(auth_exceptions.AuthenticateErrorRefreshToken):
+        await refresh_token(db=app['db'],
+                            user_data_token=token_encoded,
+                            living_time=app_authenticate['living_time'],
+                            private_key=app_authenticate['private_key'],
+                            token_cache=token_cache)
+
+
 ########################################################
 # Logout tests
 ########################################################
@@ -388,3 +427,156 @@ async def test_logout_success(app, database, get_user_data):
         refresh_token_from_db = await cursor.fetchone()
 
     assert refresh_token_from_db is None
+
+
+async def test_logout_invalidates_token_cache(app, database, get_user_data):
+    app_authenticate = app['authenticate']
+    app_authorized = app[JWT_AUTH_APP]
+    token_cache = TTLCache(max_size=10, ttl=60)
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user_data = get_user_data()
+        await create_user(conn=conn, user_data=user_data)
+
+    token = await login(db=app['db'],
+                        credentials_data={'username': user_data['username'],
+                                          'password': user_data['password']},
+                        living_time=app_authenticate['living_time'],
+                        private_key=app_authenticate['private_key'],
+                        token_cache=token_cache)
+
+    token_encoded = validate_token(token=token, public_key=app_authorized[JWT_PUBLIC_KEY])
+
+    await logout(db=app['db'],
+                 user_data_token=token_encoded,
+                 token_cache=token_cache)
+
+    assert token_encoded.jti not in token_cache
+    with pytest.raises(auth_exceptions.AuthenticateErrorRefreshToken):
+        await refresh_token(db=app['db'],
+                            user_data_token=token_encoded,
+                            living_time=app_authenticate['living_time'],
+                            private_key=app_authenticate['private_key'],
+                            token_cache=token_cache)
+
+
+async def test_logout_revokes_token(app, database, get_user_data):
+    app_authenticate = app['authenticate']
+    app_authorized = app[JWT_AUTH_APP]
+    revoked_tokens = BoundedIntSet(max_entries=10)
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user_data = get_user_data()
+        await create_user(conn=conn, user_data=user_data)
+
+    token = await login(db=app['db'],
+                        credentials_data={'username': user_data['username'],
+                                          'password': user_data['password']},
+                        living_time=app_authenticate['living_time'],
+                        private_key=app_authenticate['private_key'])
+
+    token_encoded = validate_token(token=token, public_key=app_authorized[JWT_PUBLIC_KEY])
+
+    await logout(db=app['db'],
+                 user_data_token=token_encoded,
+                 revoked_tokens=revoked_tokens)
+
+    assert token_encoded.jti in revoked_tokens
+    with pytest.raises(auth_exceptions.AuthenticateErrorRefreshToken):
+        await refresh_token(db=app['db'],
+                            user_data_token=token_encoded,
+                            living_time=app_authenticate['living_time'],
+                            private_key=app_authenticate['private_key'],
+                            revoked_tokens=revoked_tokens)
+
+
+async def test_refresh_token_fail_expired(app, database, get_user_data):
+    app_authenticate = app['authenticate']
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user = await create_user(conn=conn, user_data=get_user_data())
+        refresh_token_created = await create_refresh_token(conn=conn,
+                                                           user=user,
+                                                           living_time=-1)
+
+    user_data_token = to_user_data_token(user)
+    user_data_token.jti = refresh_token_created['id']
+
+    with pytest.raises(auth_exceptions.AuthenticateErrorRefreshToken):
+        await refresh_token(db=app['db'],
+                            user_data_token=user_data_token,
+                            living_time=app_authenticate['living_time'],
+                            private_key=app_authenticate['private_key'])
+
+
+async def test_login_max_sessions(app, database, get_user_data):
+    app_authenticate = app['authenticate']
+    app_authorized = app[JWT_AUTH_APP]
+    revoked_tokens = BoundedIntSet(max_entries=10)
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user_data = get_user_data()
+        user = await create_user(conn=conn, user_data=user_data)
+
+    tokens = []
+    for _ in range(4):
+        token = await login(db=app['db'],
+                            credentials_data={'username': user_data['username'],
+                                              'password': user_data['password']},
+                            living_time=app_authenticate['living_time'],
+                            private_key=app_authenticate['private_key'],
+                            max_sessions=2,
+                            revoked_tokens=revoked_tokens)
+        tokens.append(validate_token(token=token, public_key=app_authorized[JWT_PUBLIC_KEY]))
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        cursor: ResultProxy = await conn.execute(sa.select([refresh_tokens.c.id])
+                                                 .where(refresh_tokens.c.user_id == user['id']))
+        ids = {row['id'] for row in await cursor.fetchall()}
+
+    # the newest tokens are kept
+    assert ids == {tokens[2].jti, tokens[3].jti}
+    assert tokens[0].jti in revoked_tokens
+    assert tokens[1].jti in revoked_tokens
+
+
+async def test_evict_refresh_tokens_under_limit(app, database, get_user_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user = await create_user(conn=conn, user_data=get_user_data())
+        for _ in range(2):
+            await create_refresh_token(conn=conn, user=user)
+
+        assert await evict_refresh_tokens(conn=conn, user=user, keep=2) == 0
+        assert await evict_refresh_tokens(conn=conn, user=user, keep=3) == 0
+        assert await evict_refresh_tokens(conn=conn, user=user, keep=1) == 1
+
+
+async def test_logout_all_success(app, database, get_user_data):
+    app_authenticate = app['authenticate']
+    app_authorized = app[JWT_AUTH_APP]
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user_data = get_user_data()
+        user = await create_user(conn=conn, user_data=user_data)
+        await create_refresh_token(conn=conn, user=user)
+        await create_refresh_token(conn=conn, user=user)
+
+    token = await login(db=app['db'],
+                        credentials_data={'username': user_data['username'],
+                                          'password': user_data['password']},
+                        living_time=app_authenticate['living_time'],
+                        private_key=app_authenticate['private_key'])
+
+    token_encoded = validate_token(token=token, public_key=app_authorized[JWT_PUBLIC_KEY])
+
+    await logout_all(db=app['db'],
+                     user_data_token=token_encoded)
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        cursor: ResultProxy = await conn.execute(sa.select([refresh_tokens.c.id])
+                                                 .where(refresh_tokens.c.user_id == user['id']))
+        assert await cursor.fetchall() == []
+
+    with pytest.raises(auth_exceptions.AuthenticateErrorRefreshToken):
+        await logout_all(db=app['db'],
+                         user_data_token=token_encoded)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+    test_sweeper
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+import sqlalchemy as sa
+from aiopg.sa.connection import SAConnection
+
+from apps.authenticate.tables import refresh_tokens
+from apps.authenticate.services import create_user, create_refresh_token
+from apps.authenticate.sweeper import RefreshTokenSweeper
+
+
+async def test_sweeper_deletes_expired_tokens(app, database, get_user_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        user = await create_user(conn=conn, user_data=get_user_data())
+        for _ in range(5):
+            await create_refresh_token(conn=conn, user=user, living_time=-1)
+        alive = await create_refresh_token(conn=conn, user=user)
+
+    sweeper = RefreshTokenSweeper(db=app['db'], batch_size=2, batch_pause=0)
+    deleted = await sweeper.sweep()
+
+    assert deleted == 5
+    stats = sweeper.stats()
+    assert stats['deleted_total'] == 5
+    assert stats['batches'] == 3
+    assert stats['runs'] == 1
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        cursor = await conn.execute(sa.select([refresh_tokens.c.id])
+                                    .where(refresh_tokens.c.user_id == user['id']))
+        rows = await cursor.fetchall()
+
+    assert [row['id'] for row in rows] == [alive['id']]
+
+
+async def test_sweeper_start_stop(app, database):
+    sweeper = RefreshTokenSweeper(db=app['db'], interval=60)
+
+    sweeper.start()
+    assert sweeper.running
+
+    await sweeper.stop()
+    assert not sweeper.running
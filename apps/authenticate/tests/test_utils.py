@@ -6,12 +6,16 @@
 
 """
 
+import jwt
+import pytest
 from passlib.hash import pbkdf2_sha256
 
 from aiohttp_jwt_auth.structs import UserDataToken
 from aiohttp_jwt_auth.utils import validate_token
 
-from apps.authenticate.utils import generate_password_hash, validate_password, encode_token
+from apps.authenticate.utils import generate_password_hash, validate_password, encode_token, \
+    load_private_key, check_algorithm
+from apps.authenticate.tests.fixtures import key_path
 
 
 def test_generate_password_hash(faker):
@@ -62,3 +66,49 @@ def test_encode_token(private_key, public_key, faker):
     assert user_data_token.sub == encoded.sub
     assert user_data_token.jti == encoded.jti
     assert user_data_token.exp == encoded.exp
+
+
+def test_encode_token_loaded_key(private_key, public_key, faker):
+    user_data_token = UserDataToken({
+        'sub': faker.random_int(),
+        'jti': faker.random_int(),
+        'exp': faker.random_int()
+    })
+    token = encode_token(user_data_token=user_data_token,
+                         private_key=load_private_key(private_key))
+
+    encoded = validate_token(token=token, public_key=public_key, verify_exp=False)
+
+    assert user_data_token.sub == encoded.sub
+    assert user_data_token.jti == encoded.jti
+
+
+def test_encode_token_es256(faker):
+    with open(key_path('testkey_es256.pem'), 'rb') as key_file:
+        private_key = load_private_key(key_file.read())
+    with open(key_path('testkey_es256.pub'), 'rb') as key_file:
+        public_key = key_file.read()
+
+    user_data_token = UserDataToken({
+        'sub': faker.random_int(),
+        'jti': faker.random_int(),
+        'exp': faker.random_int()
+    })
+    token = encode_token(user_data_token=user_data_token,
+                         private_key=private_key,
+                         algorithm='ES256')
+
+    encoded = jwt.decode(token, public_key, algorithms=['ES256'], options={'verify_exp': False})
+    assert encoded['sub'] == user_data_token.sub
+
+
+###########################################################
+
+
+def test_check_algorithm_success(private_key):
+    check_algorithm(algorithm='RS256', private_key=load_private_key(private_key))
+
+
+def test_check_algorithm_fail_wrong_key(private_key):
+    with pytest.raises(ValueError):
+        check_algorithm(algorithm='ES256', private_key=load_private_key(private_key))
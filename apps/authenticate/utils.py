@@ -7,6 +7,10 @@
 """
 
 import jwt
+import jwt.algorithms
+from typing import Any, Union
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
 from passlib.hash import pbkdf2_sha256
 from aiohttp_jwt_auth.structs import UserDataToken
 
@@ -33,19 +37,50 @@ def validate_password(*, password: str, password_hash: str) -> bool:
     return res
 
 
+def load_private_key(data: bytes) -> Any:
+    """
+    Parse PEM private key once, so it is not parsed for each token
+    :param data: PEM encoded private key
+    :return: private key object, it could be passed to encode_token
+    """
+    return load_pem_private_key(data, password=None, backend=default_backend())
+
+
+def check_algorithm(*, algorithm: str, private_key: Any) -> None:
+    """
+    Check that installed PyJWT supports algorithm and key fits it.
+    Call it on start up, not to fail on the first login
+    :param algorithm: JWT algorithm (RS256, ES256 etc)
+    :param private_key: private key for signature JWT
+    :raise ValueError: if algorithm is not supported or key does not fit it
+    """
+    if algorithm not in jwt.algorithms.get_default_algorithms():
+        raise ValueError(f'JWT algorithm {algorithm} is not supported by installed PyJWT')
+
+    try:
+        jwt.encode(payload={}, key=private_key, algorithm=algorithm)
+    except (TypeError, ValueError, AttributeError) as err:
+        raise ValueError(f'Private key does not fit JWT algorithm {algorithm}: {err}')
+
+
 def encode_token(*,
                  user_data_token: UserDataToken,
-                 private_key: str) -> str:
+                 private_key: Union[str, bytes, Any],
+                 algorithm: str = 'RS256') -> str:
     """
     Encode token
     :param user_data_token: UserDataToken object
-    :param private_key: private key for signature JWT
+    :param private_key: private key for signature JWT (PEM or object from load_private_key)
+    :param algorithm: JWT algorithm
     :return:
     """
 
     token = jwt.encode(
         payload=user_data_token.to_dict(),
         key=private_key,
-        algorithm='RS256'
+        algorithm=algorithm
     )
-    return token.decode('utf-8')
+    # PyJWT < 2.0 returns bytes
+    if isinstance(token, bytes):
+        token = token.decode('utf-8')
+    return token
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+    __init__.py
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+from aiohttp import web
+
+from utils.metrics import LoopLagMonitor
+
+from .routes import init_routes
+
+
+async def start_app_metrics(app_metrics: web.Application) -> None:
+    app_metrics['loop_lag_monitor'].start()
+
+
+async def deinit_app_metrics(app_metrics: web.Application) -> None:
+    await app_metrics['loop_lag_monitor'].stop()
+
+
+def init_app_metrics(*, app: web.Application,
+                     loop_lag_interval: float = 0.5) -> None:
+    """
+    Init sub app with metrics in Prometheus format.
+    NOTE THAT endpoint has no authentication, keep it in internal network
+    :param app: main web.Application object
+    :param loop_lag_interval: time (in sec.) between measurements of event loop lag
+    :return:
+    """
+    app_metrics = web.Application()
+    app_metrics['main_app'] = app
+    app_metrics['loop_lag_monitor'] = LoopLagMonitor(interval=loop_lag_interval)
+    app_metrics.on_startup.append(start_app_metrics)
+    app_metrics.on_cleanup.append(deinit_app_metrics)
+
+    init_routes(app_metrics)
+
+    app.add_subapp('/metrics/', app_metrics)
+    app['metrics'] = app_metrics
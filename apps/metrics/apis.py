@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+    apis
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+from aiohttp import web
+
+from apps.metrics.exposition import render_metrics, CONTENT_TYPE
+
+
+class Metrics(web.View):
+    """
+    Endpoint for Prometheus
+    """
+
+    async def get(self) -> web.Response:
+        """
+        ---
+        description: This end-point for scraping metrics by Prometheus.
+        tags:
+        - Metrics
+        produces:
+        - text/plain
+        responses:
+            "200":
+                description: successful operation. Return metrics in Prometheus text format.
+        """
+        app_metrics = self.request.config_dict['metrics']
+        text = render_metrics(app_metrics['main_app'],
+                              loop_lag_monitor=app_metrics['loop_lag_monitor'])
+
+        return web.Response(body=text.encode('utf-8'),
+                            headers={'Content-Type': CONTENT_TYPE})
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+    exposition
+    ~~~~~~~~~~~~~~~
+  
+    Rendering of metrics in Prometheus text exposition format
+"""
+
+from typing import Any, List, Optional
+
+from aiohttp import web
+
+from utils.metrics import Histogram, RequestStats, LoopLagMonitor
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: Any) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _header(lines: List[str], name: str, kind: str, description: str) -> None:
+    lines.append(f'# HELP {name} {description}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _histogram(lines: List[str], name: str, histogram: Histogram, **labels: Any) -> None:
+    snapshot = histogram.snapshot()
+    for bound, count in snapshot['buckets']:
+        lines.append(f'{name}_bucket{_labels(**labels, le=_format_bound(bound))} {count}')
+    lines.append(f'{name}_sum{_labels(**labels)} {snapshot["sum"]}')
+    lines.append(f'{name}_count{_labels(**labels)} {snapshot["count"]}')
+
+
+########################################################
+
+
+def _render_requests(lines: List[str], request_stats: RequestStats) -> None:
+    items = list(request_stats.items())
+
+    _header(lines, 'http_requests_total', 'counter', 'Count of HTTP requests.')
+    for (route, method, status), histogram in items:
+        lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} '
+                     f'{histogram.count}')
+
+    _header(lines, 'http_request_duration_seconds', 'histogram', 'Latency of HTTP requests.')
+    for (route, method, status), histogram in items:
+        _histogram(lines, 'http_request_duration_seconds', histogram,
+                   route=route, method=method, status=status)
+
+
+def _render_db(lines: List[str], db: Any) -> None:
+    stats = db.stats()
+    pools = [('primary', stats)] + [(f'replica_{index}', replica)
+                                    for index, replica in enumerate(stats.get('replicas', []))]
+
+    _header(lines, 'db_pool_connections', 'gauge', 'Connections of database pool by state.')
+    for pool, pool_stats in pools:
+        lines.append(f'db_pool_connections{_labels(pool=pool, state="in_use")} {pool_stats["in_use"]}')
+        lines.append(f'db_pool_connections{_labels(pool=pool, state="idle")} {pool_stats["idle"]}')
+
+    _header(lines, 'db_pool_maxsize', 'gauge', 'Max size of database pool.')
+    for pool, pool_stats in pools:
+        lines.append(f'db_pool_maxsize{_labels(pool=pool)} {pool_stats["maxsize"]}')
+
+    _header(lines, 'db_pool_waiters', 'gauge', 'Coroutines waiting for free connection.')
+    for pool, pool_stats in pools:
+        lines.append(f'db_pool_waiters{_labels(pool=pool)} {pool_stats["waiters"]}')
+
+    _header(lines, 'db_pool_acquire_timeouts_total', 'counter', 'Timeouts of waiting for free connection.')
+    for pool, pool_stats in pools:
+        lines.append(f'db_pool_acquire_timeouts_total{_labels(pool=pool)} {pool_stats["acquire_timeouts"]}')
+
+    if 'replica_fallbacks' in stats:
+        _header(lines, 'db_replica_fallbacks_total', 'counter', 'Reads sent to primary as replicas failed.')
+        lines.append(f'db_replica_fallbacks_total {stats["replica_fallbacks"]}')
+
+    _header(lines, 'db_pool_acquire_wait_seconds', 'histogram', 'Time of waiting for free connection.')
+    for pool, pool_stats in pools:
+        wait = pool_stats['acquire_wait']
+        for bound, count in wait['buckets']:
+            lines.append(f'db_pool_acquire_wait_seconds_bucket{_labels(pool=pool, le=_format_bound(bound))} '
+                         f'{count}')
+        lines.append(f'db_pool_acquire_wait_seconds_sum{_labels(pool=pool)} {wait["sum"]}')
+        lines.append(f'db_pool_acquire_wait_seconds_count{_labels(pool=pool)} {wait["count"]}')
+
+
+def _render_loop_lag(lines: List[str], monitor: LoopLagMonitor) -> None:
+    _header(lines, 'event_loop_lag_last_seconds', 'gauge', 'The last measured lag of event loop.')
+    lines.append(f'event_loop_lag_last_seconds {monitor.lag}')
+
+    _header(lines, 'event_loop_lag_seconds', 'histogram', 'Lag of event loop.')
+    _histogram(lines, 'event_loop_lag_seconds', monitor.histogram)
+
+
+def _render_authenticate(lines: List[str], app_authenticate: web.Application) -> None:
+    _header(lines, 'auth_events_total', 'counter',
+            'Events of authenticate: logins, refreshes, failures. '
+            'Requests rejected by JWT check before the handler are not counted.')
+    for event, count in sorted(app_authenticate['counters'].items()):
+        lines.append(f'auth_events_total{_labels(event=event)} {count}')
+
+    sweeper = app_authenticate['sweeper']
+    if sweeper is not None:
+        _header(lines, 'auth_sweeper_deleted_total', 'counter', 'Expired refresh tokens deleted by sweeper.')
+        lines.append(f'auth_sweeper_deleted_total {sweeper.stats()["deleted_total"]}')
+
+
+########################################################
+
+
+def render_metrics(app: web.Application,
+                   loop_lag_monitor: Optional[LoopLagMonitor] = None) -> str:
+    """
+    Render all metrics of application.
+    Only counters are read, so rendering takes time proportional to count of routes
+    :param app: main web.Application object
+    :param loop_lag_monitor: monitor of event loop lag
+    :return: text in Prometheus exposition format
+    """
+    lines: List[str] = []
+
+    if 'request_stats' in app:
+        _render_requests(lines, app['request_stats'])
+    if 'db' in app:
+        _render_db(lines, app['db'])
+    if loop_lag_monitor is not None:
+        _render_loop_lag(lines, loop_lag_monitor)
+    if 'authenticate' in app:
+        _render_authenticate(lines, app['authenticate'])
+
+    lines.append('')
+    return '\n'.join(lines)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+    routes
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+from aiohttp import web
+
+from apps.metrics import apis
+
+
+def init_routes(app_metrics: web.Application) -> None:
+    app_metrics.add_routes([
+        web.view('/', apis.Metrics, name='metrics'),  # type: ignore
+    ])
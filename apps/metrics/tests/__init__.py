@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+    __init__
+    ~~~~~~~~~~~~~~~
+  
+
+"""
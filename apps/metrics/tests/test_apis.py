@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+    test_apis
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+from aiohttp import web, web_exceptions
+
+from utils.metrics import RequestStats
+from apps.metrics.exposition import render_metrics, CONTENT_TYPE
+
+
+def test_render_metrics():
+    app = web.Application()
+    app['request_stats'] = RequestStats(buckets=(0.1,))
+    app['request_stats'].observe('/users/{id}', 'GET', 200, 0.05)
+
+    text = render_metrics(app)
+
+    assert '# TYPE http_requests_total counter' in text
+    assert 'http_requests_total{route="/users/{id}",method="GET",status="200"} 1' in text
+    assert 'http_request_duration_seconds_bucket{route="/users/{id}",method="GET",status="200",le="0.1"} 1' \
+           in text
+    assert 'http_request_duration_seconds_bucket{route="/users/{id}",method="GET",status="200",le="+Inf"} 1' \
+           in text
+    assert text.endswith('\n')
+
+
+async def test_metrics_success(app: web.Application, database, api_client, faker):
+    app_metrics = app['metrics']
+    app_authenticate = app['authenticate']
+    url_login = app_authenticate.router['login'].url_for()
+    url_metrics = app_metrics.router['metrics'].url_for()
+
+    # failed login
+    res = await api_client.post(url_login, json={
+        'username': faker.user_name(),
+        'password': faker.password()
+    })
+    assert res.status == web_exceptions.HTTPUnauthorized.status_code
+
+    res = await api_client.get(url_metrics)
+    text = await res.text()
+
+    assert res.status == web_exceptions.HTTPOk.status_code
+    assert res.headers['Content-Type'] == CONTENT_TYPE
+    assert 'http_requests_total{route="/authenticate/login",method="POST",status="401"} 1' in text
+    assert 'auth_events_total{event="login_failures"} 1' in text
+    assert 'db_pool_connections{pool="primary",state="in_use"}' in text
+    assert 'event_loop_lag_last_seconds' in text
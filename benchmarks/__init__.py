@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+    __init__.py
+    ~~~~~~~~~~~~~~~
+  
+    Benchmarks. Each module is a script, run it from the root of the project:
+    python -m benchmarks.<module>
+"""
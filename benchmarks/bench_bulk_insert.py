@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_bulk_insert
+    ~~~~~~~~~~~~~~~
+  
+    Rows per second of create_objects (one INSERT ... VALUES for all rows)
+    against bulk_create_objects (batches of unnest arrays).
+
+    Requires database from config (CONFIG_FILE):
+    python -m benchmarks.bench_bulk_insert
+"""
+
+import asyncio
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateTable, DropTable
+
+from server.main import init_app
+from utils.db import create_objects, bulk_create_objects
+
+ROWS = 200000
+
+metadata = sa.MetaData()
+
+bench_insert = sa.Table(
+    'bench_insert', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('username', sa.String, nullable=False),
+    sa.Column('password', sa.String, nullable=False)
+)
+
+
+async def main() -> None:
+    app = await init_app()
+    data = [{'username': f'user_{i}', 'password': f'hash_{i}'} for i in range(ROWS)]
+
+    async with app['db'].acquire() as conn:
+        await conn.execute(CreateTable(bench_insert))
+        try:
+            print(f'{"method":<34}{"time, s":>10}{"rows/s":>12}')
+            methods = (
+                ('create_objects', lambda: create_objects(conn=conn, table=bench_insert, data=data)),
+                ('create_objects (no returning)',
+                 lambda: create_objects(conn=conn, table=bench_insert, data=data, returning=False)),
+                ('bulk_create_objects',
+                 lambda: bulk_create_objects(conn=conn, table=bench_insert, data=data)),
+                ('bulk_create_objects (returning)',
+                 lambda: bulk_create_objects(conn=conn, table=bench_insert, data=data, returning=True)),
+            )
+            for title, method in methods:
+                await conn.execute(f'TRUNCATE {bench_insert.name}')
+                started = time.perf_counter()
+                await method()
+                elapsed = time.perf_counter() - started
+                print(f'{title:<34}{elapsed:>10.2f}{ROWS / elapsed:>12.0f}')
+        finally:
+            await conn.execute(DropTable(bench_insert))
+
+    await app.shutdown()
+    await app.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_errors
+    ~~~~~~~~~~~~~~~
+  
+    Throughput of 401 responses of middleware_errors:
+    encoding body on each response (as before) vs pre-encoded body.
+
+    python -m benchmarks.bench_errors
+"""
+
+import asyncio
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from utils import exceptions as app_exceptions
+from utils.app import create_app
+from utils.middlewares import middleware_errors
+from apps.authenticate import exceptions as auth_exceptions
+
+NUMBER = 100000
+
+
+async def _handler(request: web.Request) -> web.Response:
+    raise auth_exceptions.AuthenticateErrorCredentials
+
+
+@web.middleware
+async def _middleware_errors_old(request, handler):  # type: ignore
+    try:
+        return await handler(request)
+    except app_exceptions.ErrorBadRequest as err:
+        return web.json_response({'reason': err.reason}, status=400)
+    except app_exceptions.ErrorAuth as err:
+        return web.json_response({'reason': err.reason}, status=401)
+
+
+async def _run(middleware, request: web.Request) -> float:  # type: ignore
+    started = time.perf_counter()
+    for _ in range(NUMBER):
+        response = await middleware(request, _handler)
+        assert response.status == 401
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    app = await create_app()
+    request = make_mocked_request('POST', '/authenticate/login', app=app)
+
+    old = await _run(_middleware_errors_old, request)
+    new = await _run(middleware_errors, request)
+
+    print(f'{"json_response per error":<28}{NUMBER / old:>12.0f} rps')
+    print(f'{"pre-encoded body":<28}{NUMBER / new:>12.0f} rps')
+    print(f'{"speedup":<28}{old / new:>11.1f}x')
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_get_one
+    ~~~~~~~~~~~~~~~
+  
+    get_one_object on a table with skewed non-unique column:
+    fetching all matching rows against LIMIT 2.
+
+    Requires database from config (CONFIG_FILE):
+    python -m benchmarks.bench_get_one
+"""
+
+import asyncio
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateTable, DropTable
+
+from server.main import init_app
+from utils import exceptions as app_exceptions
+from utils.db import get_all_objects, get_one_object
+
+ROWS = 200000
+HOT_SHARE = 0.5  # share of rows with the same value of "category"
+REPEAT = 50
+
+metadata = sa.MetaData()
+
+bench_skewed = sa.Table(
+    'bench_skewed', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('category', sa.String, nullable=False)
+)
+
+
+async def _old_get_one_object(conn, where: dict) -> None:  # type: ignore
+    res = await get_all_objects(conn=conn, table=bench_skewed, where=where)
+    if len(res) > 1:
+        raise app_exceptions.MultipleObjectsReturned
+
+
+async def _measure(conn, func) -> float:  # type: ignore
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        try:
+            await func(conn=conn, where={'category': 'hot'})
+        except app_exceptions.MultipleObjectsReturned:
+            pass
+    return (time.perf_counter() - started) / REPEAT
+
+
+async def main() -> None:
+    app = await init_app()
+    async with app['db'].acquire() as conn:
+        await conn.execute(CreateTable(bench_skewed))
+        try:
+            hot = int(ROWS * HOT_SHARE)
+            await conn.execute(
+                f"INSERT INTO {bench_skewed.name} (category) "
+                f"SELECT CASE WHEN i <= {hot} THEN 'hot' ELSE 'cold_' || i END "
+                f"FROM generate_series(1, {ROWS}) AS i"
+            )
+
+            old = await _measure(conn, _old_get_one_object)
+            new = await _measure(conn, lambda **kwargs: get_one_object(table=bench_skewed, **kwargs))
+            print(f'fetch all: {old * 1e3:.2f} ms, LIMIT 2: {new * 1e3:.2f} ms, speedup {old / new:.1f}x')
+        finally:
+            await conn.execute(DropTable(bench_skewed))
+
+    await app.shutdown()
+    await app.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_iterate
+    ~~~~~~~~~~~~~~~
+  
+    Peak memory and time of reading 1M rows:
+    get_all_objects (fetchall) against iterate_objects (server-side cursor).
+
+    Requires database from config (CONFIG_FILE):
+    python -m benchmarks.bench_iterate
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateTable, DropTable
+
+from server.main import init_app
+from utils.db import get_all_objects, iterate_objects
+
+ROWS = 1000000
+CHUNK_SIZE = 5000
+
+metadata = sa.MetaData()
+
+bench_rows = sa.Table(
+    'bench_rows', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('payload', sa.String, nullable=False)
+)
+
+
+async def _read_all(conn) -> int:  # type: ignore
+    objects = await get_all_objects(conn=conn, table=bench_rows)
+    return len(objects)
+
+
+async def _iterate(conn) -> int:  # type: ignore
+    count = 0
+    async for _ in iterate_objects(conn=conn, table=bench_rows, chunk_size=CHUNK_SIZE):
+        count += 1
+    return count
+
+
+async def _measure(conn, func) -> tuple:  # type: ignore
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = await func(conn)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+async def main() -> None:
+    app = await init_app()
+    async with app['db'].acquire() as conn:
+        await conn.execute(CreateTable(bench_rows))
+        try:
+            await conn.execute(
+                f"INSERT INTO {bench_rows.name} (payload) "
+                f"SELECT md5(i::text) FROM generate_series(1, {ROWS}) AS i"
+            )
+
+            print(f'{"method":<18}{"rows":>10}{"time, s":>10}{"peak, MB":>10}')
+            for title, func in (('get_all_objects', _read_all), ('iterate_objects', _iterate)):
+                count, elapsed, peak = await _measure(conn, func)
+                print(f'{title:<18}{count:>10}{elapsed:>10.2f}{peak / 2 ** 20:>10.1f}')
+        finally:
+            await conn.execute(DropTable(bench_rows))
+
+    await app.shutdown()
+    await app.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_json
+    ~~~~~~~~~~~~~~~
+  
+    Compare stdlib json.dumps (used by aiohttp.web.json_response)
+    with installed backends of JsonCodec on pages of 50/500/5000 records.
+
+    python -m benchmarks.bench_json
+"""
+
+import json
+import timeit
+
+from utils.codec import JsonCodec, orjson, ujson
+
+PAGE_SIZES = (50, 500, 5000)
+NUMBER = 200
+
+
+def _make_page(size: int) -> dict:
+    """
+    Same shape as Page.to_dict
+    """
+    records = [{'id': i, 'username': f'user_{i}', 'email': f'user_{i}@example.com',
+                'is_active': bool(i % 2), 'rating': i / 7}
+               for i in range(size)]
+    return {
+        'records': records,
+        'pages_count': 10,
+        'page': 1,
+        'records_count': size * 10,
+        'count_source': 'exact',
+        'has_prev': False,
+        'has_next': True
+    }
+
+
+def main() -> None:
+    backends = [JsonCodec.BACKEND_JSON] + \
+               ([JsonCodec.BACKEND_UJSON] if ujson is not None else []) + \
+               ([JsonCodec.BACKEND_ORJSON] if orjson is not None else [])
+
+    print(f'{"records":<10}{"json.dumps, us":>18}' + ''.join(f'{backend + ", us":>18}' for backend in backends))
+    for size in PAGE_SIZES:
+        page = _make_page(size)
+        number = max(NUMBER * 50 // size, 10)
+
+        baseline = timeit.timeit(lambda: json.dumps(page).encode('utf-8'), number=number)
+        line = f'{size:<10}{baseline / number * 1e6:>18.1f}'
+        for backend in backends:
+            codec = JsonCodec(backend)
+            result = timeit.timeit(lambda: codec.dumps_bytes(page), number=number)
+            line += f'{result / number * 1e6:>18.1f}'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
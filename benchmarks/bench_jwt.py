@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_jwt
+    ~~~~~~~~~~~~~~~
+  
+    Tokens per second for each JWT algorithm with test keys
+    from apps/authenticate/tests/keys.
+    ES256 is measured for comparison only: the app cannot use it currently,
+    tokens are verified by aiohttp-jwt-auth with RS256 public key.
+
+    python -m benchmarks.bench_jwt
+"""
+
+import time
+
+import jwt.algorithms
+from aiohttp_jwt_auth.structs import UserDataToken
+
+from apps.authenticate.tests.fixtures import key_path
+from apps.authenticate.utils import encode_token, load_private_key
+
+DURATION = 2.0  # sec. for each algorithm
+
+ALGORITHMS = [
+    ('RS256', 'testkey.pem'),
+    ('ES256', 'testkey_es256.pem'),
+]
+
+
+def _tokens_per_second(*, algorithm: str, private_key: object) -> float:
+    user_data_token = UserDataToken({'sub': 1, 'jti': 1, 'exp': int(time.time()) + 300})
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < DURATION:
+        encode_token(user_data_token=user_data_token,
+                     private_key=private_key,
+                     algorithm=algorithm)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    supported = jwt.algorithms.get_default_algorithms()
+    print(f'{"algorithm":<12}{"PEM, tokens/s":>16}{"loaded key, tokens/s":>24}')
+    for algorithm, key_file in ALGORITHMS:
+        if algorithm not in supported:
+            print(f'{algorithm:<12}{"not supported by installed PyJWT":>40}')
+            continue
+
+        with open(key_path(key_file), 'rb') as f:
+            pem = f.read()
+
+        raw = _tokens_per_second(algorithm=algorithm, private_key=pem)
+        loaded = _tokens_per_second(algorithm=algorithm, private_key=load_private_key(pem))
+        print(f'{algorithm:<12}{raw:>16.0f}{loaded:>24.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_login
+    ~~~~~~~~~~~~~~~
+  
+    Latency (p50/p99) of data access of successful login:
+    generic get_one_object + create_objects against prepared statements.
+    Password verification is excluded, it is the same for both paths.
+
+    Requires database from config (CONFIG_FILE) with applied migrations:
+    python -m benchmarks.bench_login
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, List
+
+from server.main import init_app
+from utils.db import get_one_object, create_objects
+from apps.authenticate.services import create_user, _select_user_by_username, _insert_refresh_token
+from apps.authenticate.tables import users, refresh_tokens
+
+CONCURRENCY = 20
+REQUESTS = 5000
+
+
+async def _old_path(conn, username: str) -> None:  # type: ignore
+    user = await get_one_object(conn=conn, table=users, where={'username': username})
+    await create_objects(conn=conn, table=refresh_tokens, data={'user_id': user['id']})
+
+
+async def _new_path(conn, username: str) -> None:  # type: ignore
+    cursor = await _select_user_by_username.execute(conn, username=username)
+    user = await cursor.fetchone()
+    cursor = await _insert_refresh_token.execute(conn, owner_id=user['id'])
+    await cursor.fetchone()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+async def _run(db, username: str, path: Callable[..., Awaitable[None]]) -> List[float]:  # type: ignore
+    latencies: List[float] = []
+    left = REQUESTS
+
+    async def worker() -> None:
+        nonlocal left
+        while left > 0:
+            left -= 1
+            started = time.perf_counter()
+            async with db.acquire() as conn:
+                await path(conn, username)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+    return latencies
+
+
+async def main() -> None:
+    app = await init_app()
+    db = app['db']
+    username = f'bench_{uuid.uuid4().hex}'
+
+    async with db.acquire() as conn:
+        await create_user(conn=conn, user_data={'username': username, 'password': 'bench'})
+
+    print(f'{"path":<10}{"p50, ms":>10}{"p99, ms":>10}{"rps":>10}')
+    for title, path in (('old', _old_path), ('new', _new_path)):
+        started = time.perf_counter()
+        latencies = await _run(db, username, path)
+        elapsed = time.perf_counter() - started
+        print(f'{title:<10}{_percentile(latencies, 50) * 1e3:>10.2f}'
+              f'{_percentile(latencies, 99) * 1e3:>10.2f}{REQUESTS / elapsed:>10.0f}')
+
+    async with db.acquire() as conn:
+        user = await get_one_object(conn=conn, table=users, where={'username': username})
+        await conn.execute(refresh_tokens.delete().where(refresh_tokens.c.user_id == user['id']))
+        await conn.execute(users.delete().where(users.c.id == user['id']))
+
+    await app.shutdown()
+    await app.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_prepared
+    ~~~~~~~~~~~~~~~
+  
+    Latency of hot auth queries sent as text (CompiledQuery)
+    against server-side prepared statements (PreparedQuery).
+    If pg_stat_statements is installed, server time per call is printed too.
+
+    Requires database from config (CONFIG_FILE) with applied migrations:
+    python -m benchmarks.bench_prepared
+"""
+
+import asyncio
+import time
+import uuid
+
+import psycopg2
+from sqlalchemy import sql
+
+from server.main import init_app
+from utils.db import CompiledQuery, PreparedQuery
+from apps.authenticate.services import create_user, create_refresh_token
+from apps.authenticate.tables import users, refresh_tokens
+
+REPEAT = 20000
+
+
+def _queries(prepared: bool) -> dict:
+    by_username = sql.select([users]).where(users.c.username == sql.bindparam('username')).limit(1)
+    by_token_id = sql.select([refresh_tokens]).where(refresh_tokens.c.id == sql.bindparam('token_id'))
+    if not prepared:
+        return {'user by username': CompiledQuery(by_username),
+                'token by id': CompiledQuery(by_token_id)}
+    return {'user by username': PreparedQuery(name='bench_user_by_username', query=by_username),
+            'token by id': PreparedQuery(name='bench_token_by_id', query=by_token_id)}
+
+
+async def _server_time(conn) -> float:  # type: ignore
+    """
+    Total planning and execution time (ms) of statements, from pg_stat_statements
+    """
+    try:
+        cursor = await conn.execute('SELECT sum(total_plan_time + total_exec_time) FROM pg_stat_statements')
+        res = await cursor.fetchone()
+        return float(res[0] or 0)
+    except psycopg2.Error:
+        return float('nan')
+
+
+async def main() -> None:
+    app = await init_app()
+    username = f'bench_{uuid.uuid4().hex}'
+
+    async with app['db'].acquire() as conn:
+        user = await create_user(conn=conn, user_data={'username': username, 'password': 'bench'})
+        token = await create_refresh_token(conn=conn, user=user)
+        params = {'user by username': {'username': username},
+                  'token by id': {'token_id': token['id']}}
+
+        print(f'{"query":<20}{"mode":<10}{"latency, us":>14}{"server, us":>14}')
+        for prepared in (False, True):
+            for title, query in _queries(prepared).items():
+                server_before = await _server_time(conn)
+                started = time.perf_counter()
+                for _ in range(REPEAT):
+                    cursor = await query.execute(conn, **params[title])
+                    await cursor.fetchone()
+                elapsed = time.perf_counter() - started
+                server = await _server_time(conn) - server_before
+                print(f'{title:<20}{"prepared" if prepared else "text":<10}'
+                      f'{elapsed / REPEAT * 1e6:>14.1f}{server / REPEAT * 1e3:>14.1f}')
+
+        await conn.execute(refresh_tokens.delete().where(refresh_tokens.c.user_id == user['id']))
+        await conn.execute(users.delete().where(users.c.id == user['id']))
+
+    await app.shutdown()
+    await app.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
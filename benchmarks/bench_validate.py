@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_validate
+    ~~~~~~~~~~~~~~~
+  
+    Compare validate_schema (builds validator on each call)
+    with precompiled SchemaValidator on typical request payloads.
+
+    python -m benchmarks.bench_validate
+"""
+
+import timeit
+
+from utils import exceptions as app_exceptions
+from utils.validate import validate_schema, SchemaValidator
+
+NUMBER = 10000
+
+_credentials_schema = {
+    'type': 'object',
+    'required': ['username', 'password'],
+    'additionalProperties': False,
+    'properties': {
+        'username': {'type': ['string', 'number']},
+        'password': {'type': ['string', 'number']},
+    }
+}
+
+_paginator_schema = {
+    'type': 'object',
+    'additionalProperties': False,
+    'properties': {
+        'limit': {'type': ['string', 'number'], 'pattern': r'^\d+$'},
+        'page': {'type': ['string', 'number'], 'pattern': r'^\d+$'},
+        'sort_by': {'type': 'string', 'enum': ['id', 'username']},
+        'order_by': {'type': 'string', 'enum': ['asc', 'desc']},
+        'filters': {
+            'type': 'object',
+            'additionalProperties': False,
+            'properties': {
+                'id': {'type': ['string', 'number'], 'pattern': r'^\d+$'},
+                'username': {'type': 'string'},
+            }
+        }
+    }
+}
+
+PAYLOADS = [
+    ('credentials valid', _credentials_schema, {'username': 'user', 'password': 'secret'}),
+    ('credentials invalid', _credentials_schema, {'username': 'user'}),
+    ('paginator valid', _paginator_schema, {'limit': '50', 'page': '3', 'sort_by': 'id',
+                                            'order_by': 'asc', 'filters': {'username': 'us'}}),
+    ('paginator invalid', _paginator_schema, {'limit': 'abc', 'sort_by': 'password',
+                                              'filters': {'password': 'x'}}),
+]
+
+
+def _check(func) -> None:  # type: ignore
+    try:
+        func()
+    except app_exceptions.ValidateDataError:
+        pass
+
+
+def main() -> None:
+    print(f'{"payload":<22}{"validate_schema, us":>22}{"SchemaValidator, us":>22}{"speedup":>10}')
+    for title, schema, data in PAYLOADS:
+        validator = SchemaValidator(schema)
+
+        old = timeit.timeit(lambda: _check(lambda: validate_schema(jsonschema=schema, data=data)),
+                            number=NUMBER)
+        new = timeit.timeit(lambda: _check(lambda: validator.validate(data)),
+                            number=NUMBER)
+
+        print(f'{title:<22}{old / NUMBER * 1e6:>22.2f}{new / NUMBER * 1e6:>22.2f}{old / new:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
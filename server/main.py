@@ -13,8 +13,9 @@ from aiohttp_swagger import setup_swagger
 
 import settings
 from utils.app import create_app
+from utils.codec import JsonCodec
 from utils.config import load_config
-from utils.db import create_db_engine
+from utils.db import create_db_router
 from utils.helpers import import_from_string
 
 from server.sub_apps import init_subapps
@@ -34,18 +35,21 @@ async def deinit_app(app: web.Application) -> None:
 
 
 async def init_app() -> web.Application:
-    app = await create_app()
-
     # read app config
     config = load_config(settings.BASE_DIR, settings.CONFIG_TRAFARET)
+
+    app = await create_app(max_json_body_size=config['max_json_body_size'])
     app['config'] = config
 
+    # JSON codec for responses and requests
+    app['json_codec'] = JsonCodec(config['json_codec'])
+
     # setup logging settings
     logging_settings = import_from_string(app['config']['logging'])
     logging.config.dictConfig(logging_settings)
 
-    # create db
-    db = await create_db_engine(**config['database'])
+    # create db (primary and read replicas)
+    db = await create_db_router(**config['database'])
     app['db'] = db
 
     # create HTTP client
@@ -12,15 +12,60 @@ from aiohttp_jwt_auth import init_auth
 
 from settings import BASE_DIR
 
+from utils.cache import TTLCache, BoundedIntSet
+from utils.executors import MeteredExecutor
 from apps.authenticate import init_app_authenticate
+from apps.authenticate.sweeper import RefreshTokenSweeper
+from apps.metrics import init_app_metrics
+from apps.authenticate.utils import load_private_key, check_algorithm
 
 
 async def init_subapps(app: web.Application) -> None:
     # init authenticate app
-    living_time: int = app['config']['authenticate']['living_time']
-    private_key_file: PurePath = BASE_DIR / app['config']['authenticate']['private_key']
+    config_authenticate: dict = app['config']['authenticate']
+    living_time: int = config_authenticate['living_time']
+    private_key_file: PurePath = BASE_DIR / config_authenticate['private_key']
     with open(private_key_file, 'rb') as f:
-        private_key: bytes = f.read()
+        private_key = load_private_key(f.read())
+    algorithm: str = config_authenticate['algorithm']
+    check_algorithm(algorithm=algorithm, private_key=private_key)
+
+    password_executor = None
+    if 'password_executor' in config_authenticate:
+        password_executor = MeteredExecutor(**config_authenticate['password_executor'])
+
+    # key object is not picklable, so signing runs only in threads
+    signing_executor = None
+    if 'signing_executor' in config_authenticate:
+        signing_executor = MeteredExecutor(kind=MeteredExecutor.KIND_THREAD,
+                                           **config_authenticate['signing_executor'])
+
+    # ttl of cache is max time while token deleted by other process is still accepted
+    token_cache = None
+    if 'token_cache' in config_authenticate:
+        token_cache = TTLCache(**config_authenticate['token_cache'])
+
+    revoked_tokens = None
+    if 'revoked_tokens' in config_authenticate:
+        revoked_tokens = BoundedIntSet(**config_authenticate['revoked_tokens'])
+
+    sweeper = None
+    if 'sweeper' in config_authenticate:
+        sweeper = RefreshTokenSweeper(db=app['db'], **config_authenticate['sweeper'])
+
     init_app_authenticate(app=app,
                           living_time=living_time,
-                          private_key=private_key)
+                          private_key=private_key,
+                          algorithm=algorithm,
+                          password_executor=password_executor,
+                          signing_executor=signing_executor,
+                          token_cache=token_cache,
+                          revoked_tokens=revoked_tokens,
+                          refresh_living_time=config_authenticate.get('refresh_living_time'),
+                          max_sessions=config_authenticate.get('max_sessions'),
+                          refresh_from_replica=config_authenticate['refresh_from_replica'],
+                          sweeper=sweeper)
+
+    # init metrics app if it need
+    if 'metrics' in app['config']:
+        init_app_metrics(app=app, **app['config']['metrics'])
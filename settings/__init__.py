@@ -19,6 +19,10 @@ CONFIG_TRAFARET: Any = t.Dict({
     t.Key('swagger', default=False): t.Bool,
     t.Key('port'): t.Int(),
     t.Key('logging', default='settings.logging.common.LOGGING'): t.String,
+    # JSON backend: auto (the fastest installed), orjson, ujson or json
+    t.Key('json_codec', default='auto'): t.Enum('auto', 'orjson', 'ujson', 'json'),
+    # max size (in bytes) of JSON body of request
+    t.Key('max_json_body_size', default=1024 ** 2): t.Int(gt=0),
     t.Key('database'):
         t.Dict({
             'user': t.String(),
@@ -26,12 +30,79 @@ CONFIG_TRAFARET: Any = t.Dict({
             'database': t.String(),
             'host': t.String(),
             'port': t.Int(),
+            # pool of connections
+            t.Key('minsize', default=1): t.Int(gte=0),
+            t.Key('maxsize', default=10): t.Int(gt=0),
+            # max time (in sec.) to wait for free connection in pool
+            t.Key('acquire_timeout', optional=True): t.Float(gt=0),
+            # max time (in ms.) of one statement on server
+            t.Key('statement_timeout', optional=True): t.Int(gt=0),
+            # read replicas, missing settings are taken from primary
+            t.Key('replicas', optional=True): t.List(t.Dict({
+                'host': t.String(),
+                'port': t.Int(),
+                t.Key('user', optional=True): t.String(),
+                t.Key('password', optional=True): t.String(),
+                t.Key('database', optional=True): t.String(),
+                t.Key('maxsize', optional=True): t.Int(gt=0),
+            })),
+            t.Key('replica_selection', default='round_robin'): t.Enum('round_robin', 'least_busy'),
         }),
     t.Key('authorized'):
         t.Dict({
             'public_key': t.String(),
             'jwt_header_prefix': t.String()
         }),
+    # metrics in Prometheus format on /metrics/, without authentication:
+    # enable it only where /metrics/ is not reachable from outside
+    t.Key('metrics', optional=True):
+        t.Dict({
+            t.Key('loop_lag_interval', default=0.5): t.Float(gt=0),
+        }),
+    t.Key('authenticate'):
+        t.Dict({
+            'living_time': t.Int(gt=0),
+            'private_key': t.String(),
+            # only algorithms which aiohttp-jwt-auth verifies (/refresh-token, /logout etc),
+            # add ES256 here when the verifier supports it
+            t.Key('algorithm', default='RS256'): t.Enum('RS256'),
+            # pool for password hashing, if absent hashing runs in event loop
+            t.Key('password_executor', optional=True):
+                t.Dict({
+                    t.Key('kind', default='thread'): t.Enum('thread', 'process'),
+                    t.Key('max_workers', default=4): t.Int(gt=0),
+                }),
+            # thread pool for signing JWT, if absent signing runs in event loop
+            t.Key('signing_executor', optional=True):
+                t.Dict({
+                    t.Key('max_workers', default=4): t.Int(gt=0),
+                }),
+            # cache of existing refresh tokens, ttl (in sec.) is max staleness
+            t.Key('token_cache', optional=True):
+                t.Dict({
+                    t.Key('max_size', default=100000): t.Int(gt=0),
+                    t.Key('ttl', default=30): t.Float(gt=0),
+                }),
+            # living time (in sec.) of refresh token, if absent REFRESH_TOKEN_LIVING_TIME is used
+            t.Key('refresh_living_time', optional=True): t.Int(gt=0),
+            # max count of refresh tokens of one user, the oldest ones are deleted on login
+            t.Key('max_sessions', optional=True): t.Int(gt=0),
+            # look for refresh token on replica first. Replica lags behind primary,
+            # so token deleted by logout is accepted for the time of replication lag
+            t.Key('refresh_from_replica', default=False): t.Bool,
+            # background deleting of expired refresh tokens
+            t.Key('sweeper', optional=True):
+                t.Dict({
+                    t.Key('interval', default=60): t.Float(gt=0),
+                    t.Key('batch_size', default=1000): t.Int(gt=0),
+                    t.Key('batch_pause', default=0.1): t.Float(gte=0),
+                }),
+            # ids of deleted refresh tokens (8 bytes per id)
+            t.Key('revoked_tokens', optional=True):
+                t.Dict({
+                    t.Key('max_entries', default=1000000): t.Int(gt=0),
+                }),
+        }),
 })
 
 BASE_DIR: PurePath = PurePath(__file__).parent.parent
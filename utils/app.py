@@ -8,9 +8,20 @@
 
 from aiohttp import web
 
-from utils.middlewares import middleware_errors
+from utils.codec import default_codec, DEFAULT_MAX_BODY_SIZE
+from utils.metrics import RequestStats
+from utils.middlewares import middleware_timing, middleware_errors
 
 
-async def create_app():
-    app = web.Application(middlewares=[middleware_errors])
+async def create_app(*, max_json_body_size: int = DEFAULT_MAX_BODY_SIZE):
+    """
+    :param max_json_body_size: max size (in bytes) of JSON body of request,
+        aiohttp does not read body larger than client_max_size, so it is raised if need
+    """
+    # timing is the outermost middleware, so it measures errors handling too
+    app = web.Application(middlewares=[middleware_timing, middleware_errors],
+                          client_max_size=max(max_json_body_size, DEFAULT_MAX_BODY_SIZE))
+    app['request_stats'] = RequestStats()
+    app['json_codec'] = default_codec
+    app['max_json_body_size'] = max_json_body_size
     return app
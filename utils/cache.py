@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+    cache
+    ~~~~~~~~~~~~~~~
+  
+    In-process caches.
+"""
+
+import heapq
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional, Set
+
+
+class TTLCache:
+    """
+    Bounded LRU cache, each entry lives no longer than ttl seconds.
+    NOTE THAT cache is not shared between processes
+    """
+
+    def __init__(self, *, max_size: int, ttl: float) -> None:
+        """
+        :param max_size: max count of entries, the least recently used entry is dropped first
+        :param ttl: default time to live of entry (in sec.)
+        """
+        assert max_size > 0
+        self._max_size = max_size
+        self._ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    ########################################################
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns value for key or default if key is missed or expired
+        """
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Put value into cache
+        :param ttl: time to live for this entry, if None default ttl is used
+        """
+        if ttl is None:
+            ttl = self._ttl
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    ########################################################
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+_MISSING = object()
+
+
+########################################################
+
+
+class BoundedIntSet:
+    """
+    Compact set of 64-bit integers with bounded size (8 bytes per entry).
+    Entries are kept in sorted array, new entries are buffered and merged in batches.
+    When set is full the smallest entries are dropped first
+    (it suits serial ids, the oldest ids are dropped).
+    NOTE THAT set is not shared between processes
+    """
+
+    def __init__(self, *, max_entries: int, merge_threshold: int = 4096) -> None:
+        """
+        :param max_entries: max count of entries
+        :param merge_threshold: count of buffered entries to merge them into sorted array,
+            until merge set could hold max_entries + merge_threshold entries
+        """
+        assert max_entries > 0
+        self._max_entries = max_entries
+        self._merge_threshold = merge_threshold
+        self._sorted = array('q')
+        # buffered entries, they are never in sorted array
+        self._pending: Set[int] = set()
+
+    ########################################################
+
+    def add(self, value: int) -> None:
+        if value in self:
+            return
+
+        self._pending.add(value)
+        if len(self._pending) >= self._merge_threshold:
+            self._merge()
+
+    def update(self, values: Iterable[int]) -> None:
+        for value in values:
+            self.add(value)
+
+    def discard(self, value: int) -> None:
+        self._pending.discard(value)
+        index = self._index(value)
+        if index is not None:
+            del self._sorted[index]
+
+    def clear(self) -> None:
+        self._sorted = array('q')
+        self._pending.clear()
+
+    def _merge(self) -> None:
+        merged = array('q', heapq.merge(self._sorted, sorted(self._pending)))
+        # drop the smallest entries
+        if len(merged) > self._max_entries:
+            del merged[:len(merged) - self._max_entries]
+        self._sorted = merged
+        self._pending.clear()
+
+    def _index(self, value: int) -> Optional[int]:
+        index = bisect_left(self._sorted, value)
+        if index < len(self._sorted) and self._sorted[index] == value:
+            return index
+        return None
+
+    ########################################################
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries
+
+    def __contains__(self, value: Any) -> bool:
+        if not isinstance(value, int):
+            return False
+
+        return value in self._pending or self._index(value) is not None
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+    codec
+    ~~~~~~~~~~~~~~~
+  
+    JSON encoding/decoding for responses and requests.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple, Union
+
+from aiohttp import web
+
+from utils import exceptions as app_exceptions
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# max size (in bytes) of JSON body of request, the same as default client_max_size of aiohttp
+DEFAULT_MAX_BODY_SIZE: int = 1024 ** 2
+
+
+def _default(obj: Any) -> Any:
+    """
+    Encodes types which are returned by database but unknown for stdlib json
+    """
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
+class JsonCodec:
+    """
+    JSON encoder/decoder with pluggable backend:
+    orjson, ujson or stdlib json.
+    With backend "auto" the fastest installed one is used
+    """
+    BACKEND_AUTO = 'auto'
+    BACKEND_ORJSON = 'orjson'
+    BACKEND_UJSON = 'ujson'
+    BACKEND_JSON = 'json'
+
+    def __init__(self, backend: str = BACKEND_AUTO) -> None:
+        """
+        :param backend: name of backend
+        """
+        if backend == self.BACKEND_AUTO:
+            backend = self.BACKEND_ORJSON if orjson is not None else \
+                self.BACKEND_UJSON if ujson is not None else \
+                self.BACKEND_JSON
+
+        if backend == self.BACKEND_ORJSON and orjson is None or \
+                backend == self.BACKEND_UJSON and ujson is None:
+            raise ValueError(f'JSON backend {backend} is not installed')
+        if backend not in (self.BACKEND_ORJSON, self.BACKEND_UJSON, self.BACKEND_JSON):
+            raise ValueError(f'Unknown JSON backend: {backend}')
+
+        self._backend = backend
+
+    ########################################################
+
+    def dumps(self, obj: Any) -> str:
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """
+        Encode object to JSON (utf-8)
+        """
+        if self._backend == self.BACKEND_ORJSON:
+            return orjson.dumps(obj, default=_default)
+
+        if self._backend == self.BACKEND_UJSON:
+            try:
+                return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+            except (TypeError, OverflowError):
+                # there are types which ujson does not know (datetime etc)
+                pass
+
+        return json.dumps(obj, ensure_ascii=False, default=_default).encode('utf-8')
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """
+        Decode JSON
+        :raise ValueError: invalid JSON
+        """
+        if self._backend == self.BACKEND_ORJSON:
+            return orjson.loads(data)
+
+        if self._backend == self.BACKEND_UJSON:
+            return ujson.loads(data)
+
+        return json.loads(data)
+
+    ########################################################
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+
+default_codec = JsonCodec()
+
+# (status, reason) -> encoded body of error response
+_error_bodies: Dict[Tuple[int, Optional[str]], bytes] = {}
+_ERROR_BODIES_MAX_SIZE = 1024
+
+
+def get_error_body(status: int, reason: Optional[str]) -> bytes:
+    """
+    Returns JSON body of error response without details.
+    Body is encoded once for each pair of status and reason
+    :param status: HTTP status
+    :param reason: error's reason
+    :return: encoded body
+    """
+    key = (status, reason)
+    body = _error_bodies.get(key)
+    if body is None:
+        body = default_codec.dumps_bytes({} if reason is None else {'reason': reason})
+        if len(_error_bodies) < _ERROR_BODIES_MAX_SIZE:
+            _error_bodies[key] = body
+    return body
+
+
+########################################################
+
+
+def get_codec(request: web.Request) -> JsonCodec:
+    """
+    Returns JSON codec of application
+    """
+    return request.config_dict.get('json_codec', default_codec)
+
+
+def json_response(request: web.Request,
+                  data: Any,
+                  *,
+                  status: int = 200) -> web.Response:
+    """
+    Same as aiohttp.web.json_response but uses JSON codec of application
+    :param request: current request
+    :param data: object to encode
+    :param status: HTTP status
+    :return: response
+    """
+    return web.Response(body=get_codec(request).dumps_bytes(data),
+                        status=status,
+                        content_type='application/json')
+
+
+async def read_json_body(request: web.Request,
+                         *,
+                         max_size: Optional[int] = None) -> Any:
+    """
+    Read body of request and decode it with JSON codec of application.
+    Unlike request.json() raw bytes are decoded, without making str
+    :param request: current request
+    :param max_size: max size of body (in bytes), if None app's "max_json_body_size" is used
+    :raise ErrorBadRequestBodyTooLarge: body is larger than max_size
+    :raise ValueError: invalid JSON
+    :return: decoded data
+    """
+    if max_size is None:
+        max_size = request.config_dict.get('max_json_body_size', DEFAULT_MAX_BODY_SIZE)
+
+    # check declared size before reading
+    if request.content_length is not None and request.content_length > max_size:
+        raise app_exceptions.ErrorBadRequestBodyTooLarge
+
+    body = await request.read()
+    # chunked body has no declared size
+    if len(body) > max_size:
+        raise app_exceptions.ErrorBadRequestBodyTooLarge
+
+    return get_codec(request).loads(body)
@@ -6,18 +6,34 @@
 
 """
 
-from typing import Any, Union, Optional
+import asyncio
+import logging
+import re
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Union, Optional, Tuple
+import psycopg2
 from sqlalchemy import sql
 from sqlalchemy import func
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.compiler import Compiled
 from aiopg.sa.connection import SAConnection
 from aiopg.sa.result import ResultProxy
 from aiopg.sa import create_engine
-from aiopg.sa.engine import Engine
+from aiopg.sa.engine import Engine, get_dialect
 
 from utils import exceptions as app_exceptions
+from utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
 
 _DSN_FORMAT = DSN = "postgresql://{user}:{password}@{host}:{port}/{database}"
 
+_dialect = get_dialect()
+
 
 def get_dsn_database(**kwargs: str) -> str:
     """
@@ -31,14 +47,401 @@ def get_dsn_database(**kwargs: str) -> str:
 ########################################################
 
 
-async def create_db_engine(**kwargs: str) -> Engine:
+def _process_params(compiled: Compiled, params: dict) -> dict:
+    """
+    Convert values of parameters by types of their columns (Enum, TypeDecorator etc),
+    the same as SQLAlchemy and aiopg do for executed core query
+    """
+    processors = compiled._bind_processors
+    return {key: processors[key](value) if key in processors else value
+            for key, value in params.items()}
+
+
+def compile_query(query: Any) -> Tuple[str, dict]:
+    """
+    Compile SQLAlchemy core query to SQL string with bound parameters.
+    Useful to wrap query into raw SQL (EXPLAIN, DECLARE CURSOR etc).
+    NOTE THAT rows of raw SQL are not converted by types of columns
+    :param query: SQLAlchemy core query
+    :return: SQL string and dict with parameters
+    """
+    compiled = query.compile(dialect=_dialect)
+    return str(compiled), _process_params(compiled, compiled.params)
+
+
+class _CompiledStatement(ClauseElement):
+    """
+    Statement which returns already compiled query,
+    so aiopg does not compile it again, but converts parameters and rows by types of columns
+    """
+
+    def __init__(self, compiled: Compiled) -> None:
+        self._compiled = compiled
+
+    def compile(self, bind: Any = None, dialect: Any = None, **kwargs: Any) -> Compiled:
+        return self._compiled
+
+
+class CompiledQuery:
+    """
+    Query compiled to SQL string only once.
+    Values for sql.bindparam are passed on each execute
+    """
+
+    def __init__(self, query: Any) -> None:
+        """
+        :param query: SQLAlchemy core query with sql.bindparam
+        """
+        self._compiled = query.compile(dialect=_dialect)
+        self._sql = str(self._compiled)
+        self._defaults = self._compiled.params
+        self._statement = _CompiledStatement(self._compiled)
+
+    @property
+    def sql(self) -> str:
+        return self._sql
+
+    async def execute(self, conn: SAConnection, **params: Any) -> ResultProxy:
+        """
+        Execute query with values for its bindparams
+        """
+        return await conn.execute(self._statement, {**self._defaults, **params})
+
+
+class PreparedQuery(CompiledQuery):
+    """
+    Server-side prepared statement (PREPARE/EXECUTE).
+    Statement is prepared once for each connection of pool,
+    then server skips parsing and planning on each execute.
+    Use it for hot queries of the same shape.
+    NOTE THAT parameters are converted by types of columns, but rows are not (they are raw values)
+    """
+    # SQL state: prepared statement does not exist / already exists
+    _PGCODE_UNDEFINED = '26000'
+    _PGCODE_DUPLICATE = '42P05'
+
+    def __init__(self, *, name: str, query: Any) -> None:
+        """
+        :param name: unique name of prepared statement
+        :param query: SQLAlchemy core query with sql.bindparam
+        """
+        super().__init__(query)
+        self._name = name
+        self._params: list = []
+
+        def to_positional(match: Any) -> str:
+            param = match.group(1)
+            # escaped percent sign (LIKE 'abc%%' etc) is left as is
+            if param is None:
+                return match.group(0)
+            if param not in self._params:
+                self._params.append(param)
+            return f'${self._params.index(param) + 1}'
+
+        # aiopg always passes parameters to psycopg2, so PREPARE text is formatted
+        # and "%%" becomes "%" on sending, the same as in EXECUTE and other queries
+        text = re.sub(r'%%|%\((\w+)\)s', to_positional, self._sql)
+        self._prepare_sql = f'PREPARE {name} AS {text}'
+        self._execute_sql = f'EXECUTE {name}'
+        if self._params:
+            self._execute_sql += f' ({", ".join(f"%({param})s" for param in self._params)})'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def _prepare(self, conn: SAConnection, prepared: set) -> None:
+        try:
+            await conn.execute(self._prepare_sql)
+        except psycopg2.ProgrammingError as err:
+            if err.pgcode != self._PGCODE_DUPLICATE:
+                raise
+        prepared.add(self._name)
+
+    async def execute(self, conn: SAConnection, **params: Any) -> ResultProxy:
+        """
+        Prepare statement on the connection if it has not been prepared and execute it.
+        If statement has been deallocated on server (DISCARD ALL etc), it is prepared again,
+        but not inside transaction: the error has aborted it, so the error is raised
+        and statement is prepared on the next execute
+        """
+        prepared = _prepared_statements.setdefault(conn.connection, set())
+        if self._name not in prepared:
+            await self._prepare(conn, prepared)
+
+        params = _process_params(self._compiled, {**self._defaults, **params})
+        try:
+            return await conn.execute(self._execute_sql, params)
+        except psycopg2.ProgrammingError as err:
+            # statement has been deallocated on server (DISCARD ALL etc)
+            if err.pgcode != self._PGCODE_UNDEFINED:
+                raise
+            prepared.discard(self._name)
+            if conn.in_transaction:
+                raise
+
+        await self._prepare(conn, prepared)
+        return await conn.execute(self._execute_sql, params)
+
+
+# names of statements prepared on each raw connection
+_prepared_statements: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+########################################################
+
+
+class _AcquireContext:
+    """
+    Result of DbEngine.acquire, could be used with "async with" or awaited
+    """
+    __slots__ = ('_acquire', '_conn')
+
+    def __init__(self, acquire: Callable[[], Awaitable[SAConnection]]) -> None:
+        self._acquire = acquire
+        self._conn: Optional[SAConnection] = None
+
+    async def __aenter__(self) -> SAConnection:
+        self._conn = await self._acquire()
+        return self._conn
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        conn, self._conn = self._conn, None
+        assert conn is not None
+        # returns connection to pool
+        await conn.close()
+
+    def __await__(self) -> Any:
+        return self._acquire().__await__()
+
+
+class DbEngine:
+    """
+    aiopg engine with acquire timeout and pool metrics
+    """
+
+    def __init__(self, engine: Engine, *,
+                 acquire_timeout: Optional[float] = None) -> None:
+        """
+        :param engine: aiopg engine
+        :param acquire_timeout: max time (in sec.) to wait for free connection, None for no limit
+        """
+        self._engine = engine
+        self._acquire_timeout = acquire_timeout
+        self._waiters: int = 0
+        self._acquire_timeouts: int = 0
+        self._acquire_wait = Histogram()
+
+    ########################################################
+
+    def acquire(self) -> _AcquireContext:
+        return _AcquireContext(self._acquire)
+
+    async def _acquire(self) -> SAConnection:
+        self._waiters += 1
+        started = time.monotonic()
+        try:
+            if self._acquire_timeout is None:
+                return await self._engine.acquire()
+            return await asyncio.wait_for(self._engine.acquire(), timeout=self._acquire_timeout)
+        except asyncio.TimeoutError:
+            self._acquire_timeouts += 1
+            raise
+        finally:
+            self._waiters -= 1
+            self._acquire_wait.observe(time.monotonic() - started)
+
+    def close(self) -> None:
+        self._engine.close()
+
+    async def wait_closed(self) -> None:
+        await self._engine.wait_closed()
+
+    ########################################################
+
+    @property
+    def engine(self) -> Engine:
+        return self._engine
+
+    @property
+    def in_use(self) -> int:
+        return self._engine.size - self._engine.freesize
+
+    @property
+    def idle(self) -> int:
+        return self._engine.freesize
+
+    @property
+    def waiters(self) -> int:
+        return self._waiters
+
+    def stats(self) -> dict:
+        """
+        Live metrics of pool
+        """
+        return {
+            'minsize': self._engine.minsize,
+            'maxsize': self._engine.maxsize,
+            'size': self._engine.size,
+            'in_use': self.in_use,
+            'idle': self.idle,
+            'waiters': self._waiters,
+            'acquire_timeouts': self._acquire_timeouts,
+            'acquire_wait': self._acquire_wait.snapshot()
+        }
+
+
+async def create_db_engine(*,
+                           minsize: int = 1,
+                           maxsize: int = 10,
+                           acquire_timeout: Optional[float] = None,
+                           statement_timeout: Optional[int] = None,
+                           **kwargs: Any) -> DbEngine:
     """
     Create db engine
-    :param kwargs: settings for database
+    :param minsize: min count of connections in pool
+    :param maxsize: max count of connections in pool
+    :param acquire_timeout: max time (in sec.) to wait for free connection
+    :param statement_timeout: max time (in ms.) of one statement on server
+    :param kwargs: settings for database (user, password, host etc)
     :return: database's engine
     """
-    engine: Engine = await create_engine(**kwargs)
-    return engine
+    if statement_timeout is not None:
+        kwargs['options'] = f'-c statement_timeout={statement_timeout}'
+
+    engine: Engine = await create_engine(minsize=minsize, maxsize=maxsize, **kwargs)
+    return DbEngine(engine, acquire_timeout=acquire_timeout)
+
+
+class DbRouter:
+    """
+    Routes queries between primary database and its read replicas.
+    acquire() always returns connection to primary,
+    acquire_read() returns connection to one of replicas (or to primary if there are no alive replicas).
+    Use acquire_read() only for reads which tolerate replication lag.
+    NOTE THAT it falls back to primary only if connection cannot be acquired,
+    errors of queries on acquired replica connection are raised to caller
+    """
+    SELECTION_ROUND_ROBIN = 'round_robin'
+    SELECTION_LEAST_BUSY = 'least_busy'
+
+    # time (in sec.) while failed replica is not used
+    REPLICA_RETRY_DELAY: float = 5.0
+
+    def __init__(self, *,
+                 primary: DbEngine,
+                 replicas: Optional[List[DbEngine]] = None,
+                 selection: str = SELECTION_ROUND_ROBIN) -> None:
+        """
+        :param primary: engine of primary database
+        :param replicas: engines of read replicas
+        :param selection: how to select replica for read: round_robin or least_busy
+        """
+        if selection not in (self.SELECTION_ROUND_ROBIN, self.SELECTION_LEAST_BUSY):
+            raise ValueError(f'Unknown replica selection: {selection}')
+
+        self._primary = primary
+        self._replicas: List[DbEngine] = list(replicas or [])
+        self._selection = selection
+        self._next_replica: int = 0
+        # index of replica -> time until it is not used
+        self._failed_until: Dict[int, float] = {}
+        self._fallbacks: int = 0
+
+    ########################################################
+
+    def acquire(self) -> _AcquireContext:
+        return self._primary.acquire()
+
+    def acquire_read(self) -> _AcquireContext:
+        return _AcquireContext(self._acquire_read)
+
+    async def _acquire_read(self) -> SAConnection:
+        for index in self._get_replicas_order():
+            try:
+                return await self._replicas[index]._acquire()
+            except (asyncio.TimeoutError, psycopg2.Error, OSError) as exc:
+                logger.warning(f'Cannot acquire connection to replica {index}: {exc}')
+                self._failed_until[index] = time.monotonic() + self.REPLICA_RETRY_DELAY
+
+        if self._replicas:
+            self._fallbacks += 1
+
+        return await self._primary._acquire()
+
+    def _get_replicas_order(self) -> List[int]:
+        """
+        Indexes of alive replicas in order they should be tried
+        """
+        now = time.monotonic()
+        alive = [index for index in range(len(self._replicas))
+                 if self._failed_until.get(index, 0) <= now]
+        if not alive:
+            return alive
+
+        if self._selection == self.SELECTION_LEAST_BUSY:
+            return sorted(alive, key=lambda index: self._replicas[index].in_use + self._replicas[index].waiters)
+
+        start = self._next_replica % len(alive)
+        self._next_replica += 1
+        return alive[start:] + alive[:start]
+
+    def close(self) -> None:
+        self._primary.close()
+        for replica in self._replicas:
+            replica.close()
+
+    async def wait_closed(self) -> None:
+        await self._primary.wait_closed()
+        for replica in self._replicas:
+            await replica.wait_closed()
+
+    ########################################################
+
+    @property
+    def primary(self) -> DbEngine:
+        return self._primary
+
+    @property
+    def replicas(self) -> List[DbEngine]:
+        return self._replicas
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self._replicas)
+
+    def stats(self) -> dict:
+        """
+        Live metrics of primary's pool and replicas' pools
+        """
+        return {
+            **self._primary.stats(),
+            'replica_fallbacks': self._fallbacks,
+            'replicas': [replica.stats() for replica in self._replicas]
+        }
+
+
+async def create_db_router(*,
+                           replicas: Optional[List[dict]] = None,
+                           replica_selection: str = DbRouter.SELECTION_ROUND_ROBIN,
+                           **kwargs: Any) -> DbRouter:
+    """
+    Create engines for primary database and its read replicas
+    :param replicas: settings of replicas, missing settings are taken from primary
+    :param replica_selection: how to select replica for read: round_robin or least_busy
+    :param kwargs: settings for primary database (see create_db_engine)
+    :return: router between engines
+    """
+    primary = await create_db_engine(**kwargs)
+
+    replica_engines = []
+    for replica in replicas or []:
+        # replica connects lazily, so unavailable replica does not break start of app
+        replica_engines.append(await create_db_engine(**{**kwargs, 'minsize': 0, **replica}))
+
+    return DbRouter(primary=primary,
+                    replicas=replica_engines,
+                    selection=replica_selection)
 
 
 ########################################################
@@ -60,6 +463,84 @@ def create_contains_clause(table: Any, kwargs: dict) -> list:
     return [table.c[k].contains(v) for k, v in kwargs.items()]
 
 
+########################################################
+# Cache of compiled statements.
+# Values of filters are passed as bound parameters, so statement
+# depends only on table, operation and set of filtered columns
+########################################################
+
+_QUERY_CACHE_SIZE: int = 512
+_query_cache: OrderedDict = OrderedDict()
+_query_cache_stats: dict = {'hits': 0, 'misses': 0}
+
+
+def get_query_cache_info() -> dict:
+    """
+    Returns counters of cache of compiled statements
+    """
+    return {
+        **_query_cache_stats,
+        'size': len(_query_cache),
+        'max_size': _QUERY_CACHE_SIZE
+    }
+
+
+def clear_query_cache() -> None:
+    _query_cache.clear()
+    _query_cache_stats['hits'] = 0
+    _query_cache_stats['misses'] = 0
+
+
+def _get_cached_query(key: tuple, build: Callable[[], Any]) -> CompiledQuery:
+    """
+    Returns compiled statement for key, builds and compiles it on miss
+    :param key: (operation, table, filters shape...)
+    :param build: returns SQLAlchemy core query with sql.bindparam
+    """
+    try:
+        compiled = _query_cache[key]
+    except KeyError:
+        _query_cache_stats['misses'] += 1
+        compiled = CompiledQuery(build())
+        _query_cache[key] = compiled
+        if len(_query_cache) > _QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+        return compiled
+
+    _query_cache_stats['hits'] += 1
+    _query_cache.move_to_end(key)
+    return compiled
+
+
+def _get_filters_shape(where: Optional[dict], contains: Optional[dict]) -> tuple:
+    """
+    Part of cache key for filters: columns and if value is NULL (it is "IS NULL" in SQL)
+    """
+    where_shape = tuple((k, v is None) for k, v in (where or {}).items())
+    contains_shape = tuple((contains or {}).keys())
+    return where_shape, contains_shape
+
+
+def _get_filters_params(where: Optional[dict], contains: Optional[dict]) -> dict:
+    params = {f'where_{k}': v for k, v in (where or {}).items() if v is not None}
+    params.update({f'contains_{k}': v for k, v in (contains or {}).items()})
+    return params
+
+
+def _apply_filters(query: Any, table: Any, filters_shape: tuple) -> Any:
+    """
+    Add where clause with sql.bindparam for filters
+    """
+    where_shape, contains_shape = filters_shape
+    clause = [table.c[k].is_(None) if is_null else table.c[k] == sql.bindparam(f'where_{k}')
+              for k, is_null in where_shape]
+    clause += [table.c[k].contains(sql.bindparam(f'contains_{k}')) for k in contains_shape]
+
+    if clause:
+        query = query.where(sql.and_(*clause))
+    return query
+
+
 ########################################################
 
 async def get_all_objects(*,
@@ -78,8 +559,71 @@ async def get_all_objects(*,
     :param limit: limit for SQL quert
     :return:
     """
+    filters_shape = _get_filters_shape(where, contains)
+
+    def build() -> Any:
+        query = sql.select([table])
+        query = _apply_filters(query, table, filters_shape)
+        #
+        if offset:
+            query = query.offset(sql.bindparam('offset'))
+        #
+        if limit:
+            query = query.limit(sql.bindparam('limit'))
+        return query
+
+    compiled = _get_cached_query(('select', table, filters_shape, bool(offset), bool(limit)), build)
+
+    params = _get_filters_params(where, contains)
+    if offset:
+        params['offset'] = offset
+    if limit:
+        params['limit'] = limit
+
+    cursor: ResultProxy = await compiled.execute(conn, **params)
+    objects = await cursor.fetchall()
+    return objects
+
+
+########################################################
+
+@asynccontextmanager
+async def aclosing(generator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Close async generator on exit, like contextlib.aclosing of python 3.10.
+    Closing iterate_objects ends its transaction, so connection could be used again
+    """
+    try:
+        yield generator
+    finally:
+        await generator.aclose()
+
+
+async def iterate_objects(*,
+                          conn: SAConnection,
+                          table: Any,
+                          where: Optional[dict] = None,
+                          contains: Optional[dict] = None,
+                          chunk_size: int = 1000) -> AsyncIterator[Any]:
+    """
+    Read objects from database one by one.
+    Rows are fetched in chunks from server-side cursor, so memory does not depend on count of rows.
+    Cursor lives in transaction, the connection must not be used for other queries during iteration.
+    If iteration is stopped early (break, exception) the transaction stays open until
+    the generator is closed, so wrap it into aclosing:
+
+    async with aclosing(iterate_objects(conn=conn, table=table)) as objects:
+        async for obj in objects:
+            ...
+
+    :param conn:
+    :param table:
+    :param where:
+    :param contains:
+    :param chunk_size: count of rows for one fetch
+    :return:
+    """
     query = sql.select([table])
-    # query = sql.select([table.c['id']])
 
     if where:
         where_clause = create_where_clause(table=table, kwargs=where)
@@ -89,15 +633,20 @@ async def get_all_objects(*,
         contains_clause = create_contains_clause(table=table, kwargs=contains)
         query = query.where(sql.and_(*contains_clause))
     #
-    if offset:
-        query = query.offset(offset)
-    #
-    if limit:
-        query = query.limit(limit)
 
-    cursor: ResultProxy = await conn.execute(query)
-    objects = await cursor.fetchall()
-    return objects
+    query_str, params = compile_query(query)
+    cursor_name = f'iterate_{uuid.uuid4().hex}'
+
+    # cursor is closed by the end of transaction
+    async with conn.begin():
+        await conn.execute(f'DECLARE {cursor_name} NO SCROLL CURSOR FOR {query_str}', params)
+        while True:
+            cursor: ResultProxy = await conn.execute(f'FETCH FORWARD {int(chunk_size)} FROM {cursor_name}')
+            objects = await cursor.fetchall()
+            for obj in objects:
+                yield obj
+            if len(objects) < chunk_size:
+                break
 
 
 ########################################################
@@ -107,13 +656,18 @@ async def get_one_object(*,
                          table: Any,
                          where: dict) -> Any:
     """
-    Read from database only one object
+    Read from database only one object.
+    Only two rows are enough to detect duplicates,
+    lookup by primary key can not return duplicates at all
     :param conn:
     :param table:
     :param query:
     :return:
     """
-    res = await get_all_objects(conn=conn, table=table, where=where)
+    pk_keys = {column.key for column in table.primary_key.columns}
+    limit = 1 if pk_keys and pk_keys.issubset(where) else 2
+
+    res = await get_all_objects(conn=conn, table=table, where=where, limit=limit)
     if not res:
         raise app_exceptions.DoesNotExist
     if len(res) > 1:
@@ -127,24 +681,114 @@ async def get_one_object(*,
 async def create_objects(*,
                          conn: SAConnection,
                          table: Any,
-                         data: Union[dict, list]) -> list:
-    query = table.insert().values(data).returning(table)
+                         data: Union[dict, list],
+                         returning: bool = True) -> list:
+    """
+    Insert objects into database with one statement.
+    For big lists use bulk_create_objects
+    :param conn:
+    :param table:
+    :param data: one object or list of objects
+    :param returning: return created objects, otherwise returns empty list
+    :return:
+    """
+    query = table.insert().values(data)
+    if not returning:
+        await conn.execute(query)
+        return []
+
+    query = query.returning(table)
     cursor: ResultProxy = await conn.execute(query)
     objects = await cursor.fetchall()
     return objects
 
 
+########################################################
+
+_bulk_insert_sql: dict = {}
+
+
+def _get_bulk_insert_sql(table: Any, columns: Tuple[str, ...], returning: bool) -> str:
+    """
+    SQL for bulk insert: each column is passed as array and unnested on server.
+    SQL template is built once for set of columns, but psycopg2 renders each list
+    as ARRAY[...] literal, so statement sent to server still grows with count of rows
+    """
+    key = (table, columns, returning)
+    try:
+        return _bulk_insert_sql[key]
+    except KeyError:
+        pass
+
+    preparer = _dialect.identifier_preparer
+    names = ', '.join(preparer.quote(column) for column in columns)
+    arrays = ', '.join(f'%({column})s::{table.c[column].type.compile(dialect=_dialect)}[]'
+                       for column in columns)
+    query_str = f'INSERT INTO {preparer.format_table(table)} ({names}) ' \
+                f'SELECT * FROM unnest({arrays})'
+    if returning:
+        query_str += ' RETURNING *'
+
+    _bulk_insert_sql[key] = query_str
+    return query_str
+
+
+async def bulk_create_objects(*,
+                              conn: SAConnection,
+                              table: Any,
+                              data: list,
+                              batch_size: int = 10000,
+                              returning: bool = False) -> Union[list, int]:
+    """
+    Insert a lot of objects into database.
+    Objects are sent in batches, each batch is one statement with one array of values per column,
+    its size is limited by batch_size. All objects must have the same keys.
+    All batches are inserted in one transaction: if any batch fails nothing is inserted.
+    NOTE THAT COPY FROM STDIN is not available for asynchronous connections of aiopg
+    :param conn:
+    :param table:
+    :param data: list of dicts
+    :param batch_size: count of objects in one statement
+    :param returning: return created objects (in any order), otherwise returns count of created objects
+    :return:
+    """
+    if not data:
+        return [] if returning else 0
+
+    columns = tuple(data[0].keys())
+    query_str = _get_bulk_insert_sql(table, columns, returning)
+
+    objects: list = []
+    count = 0
+    # if conn is already in transaction, batches become part of it
+    async with conn.begin():
+        for start in range(0, len(data), batch_size):
+            batch = data[start:start + batch_size]
+            params = {column: [obj[column] for obj in batch] for column in columns}
+
+            cursor: ResultProxy = await conn.execute(query_str, params)
+            if returning:
+                objects.extend(await cursor.fetchall())
+            count += len(batch)
+
+    return objects if returning else count
+
+
 ########################################################
 
 async def delete_objects(*,
                          conn: SAConnection,
                          table: Any,
                          query: dict) -> list:
-    where_clause = create_where_clause(table=table, kwargs=query)
-    query = table.delete() \
-        .where(sql.and_(*where_clause)).returning(table)
+    filters_shape = _get_filters_shape(query, None)
 
-    cursor: ResultProxy = await conn.execute(query)
+    def build() -> Any:
+        delete_query = _apply_filters(table.delete(), table, filters_shape)
+        return delete_query.returning(table)
+
+    compiled = _get_cached_query(('delete', table, filters_shape), build)
+
+    cursor: ResultProxy = await compiled.execute(conn, **_get_filters_params(query, None))
     objects = await cursor.fetchall()
     return objects
 
@@ -165,18 +809,15 @@ async def get_count(*,
     :param contains:
     :return:
     """
-    query = sql.select([func.count().label('count')])\
-        .select_from(table)
+    filters_shape = _get_filters_shape(where, contains)
 
-    if where:
-        where_clause = create_where_clause(table=table, kwargs=where)
-        query = query.where(sql.and_(*where_clause))
-    #
-    if contains:
-        contains_clause = create_contains_clause(table=table, kwargs=contains)
-        query = query.where(sql.and_(*contains_clause))
-    #
+    def build() -> Any:
+        query = sql.select([func.count().label('count')])\
+            .select_from(table)
+        return _apply_filters(query, table, filters_shape)
 
-    cursor: ResultProxy = await conn.execute(query)
+    compiled = _get_cached_query(('count', table, filters_shape), build)
+
+    cursor: ResultProxy = await compiled.execute(conn, **_get_filters_params(where, contains))
     res = await cursor.fetchone()
     return res['count']
@@ -10,6 +10,8 @@ from typing import Optional, Union
 
 
 class ExceptionEx(Exception):
+    # HTTP status of response, None for exceptions which are not for Http apis
+    status_code: Optional[int] = None
     _reason: Optional[str] = None
     _detail: dict
 
@@ -37,6 +39,7 @@ class ErrorBadRequest(ExceptionEx):
     Exception for bad request
     Http code: 400
     """
+    status_code = 400
     _reason = 'BAD_REQUEST'
 
 
@@ -45,7 +48,7 @@ class ErrorAuth(ExceptionEx):
     Some auth errors
     Http code: 401
     """
-    pass
+    status_code = 401
 
 
 class ErrorNotFound(ExceptionEx):
@@ -53,13 +56,16 @@ class ErrorNotFound(ExceptionEx):
     Something has not been found
     Http code: 404
     """
+    status_code = 404
     _reason = 'ERR_NOT_FOUND'
 
 
 class ErrorInternalServer(ExceptionEx):
     """
     Internal server error
+    Http code: 500
     """
+    status_code = 500
     _reason = 'ERR_INTERNAL_SERVER_ERROR'
 
 
@@ -74,6 +80,15 @@ class ErrorBadRequestJson(ErrorBadRequest):
     _reason = 'ERR_NO_JSON_DATA'
 
 
+class ErrorBadRequestBodyTooLarge(ErrorBadRequest):
+    """
+    Body of request is larger than allowed
+    Http code: 413
+    """
+    status_code = 413
+    _reason = 'ERR_BODY_TOO_LARGE'
+
+
 class ErrorBadRequestValidationError(ErrorBadRequest):
     """
     Error validation some data
@@ -88,9 +103,6 @@ class ErrorBadRequestQueryParams(ErrorBadRequest):
     _reason = 'ERR_QUERY'
 
 
-########################################################
-
-
 ########################################################
 # Exceptions for data operations
 ########################################################
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+    executors
+    ~~~~~~~~~~~~~~~
+  
+    Executors for CPU bound functions which must not block event loop.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from utils.metrics import Histogram
+
+
+def _timed_call(func: Callable, submitted_at: float, kwargs: dict) -> tuple:
+    """
+    Runs in worker (thread or process).
+    Wall clock is used because monotonic clock may not be shared between processes
+    :return: (time in queue, result of func)
+    """
+    waited = time.time() - submitted_at
+    return waited, func(**kwargs)
+
+
+class MeteredExecutor:
+    """
+    Thread or process pool with queue depth and wait time metrics.
+    For process pool func and its arguments have to be picklable
+    """
+    KIND_THREAD: str = 'thread'
+    KIND_PROCESS: str = 'process'
+
+    def __init__(self, *,
+                 kind: str = KIND_THREAD,
+                 max_workers: int = 4) -> None:
+        """
+        :param kind: "thread" or "process"
+        :param max_workers: count of workers
+        """
+        assert kind in (self.KIND_THREAD, self.KIND_PROCESS)
+        self._kind = kind
+        self._max_workers = max_workers
+        self._executor: Executor
+        if kind == self.KIND_PROCESS:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self._pending: int = 0
+        self._wait_time = Histogram()
+
+    ########################################################
+
+    async def run(self, func: Callable, **kwargs: Any) -> Any:
+        """
+        Run func in pool and wait for result
+        """
+        loop = asyncio.get_event_loop()
+        call = functools.partial(_timed_call, func, time.time(), kwargs)
+
+        self._pending += 1
+        try:
+            waited, result = await loop.run_in_executor(self._executor, call)
+        finally:
+            self._pending -= 1
+
+        self._wait_time.observe(waited)
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    ########################################################
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    @property
+    def pending(self) -> int:
+        """
+        Count of submitted calls which have not been finished
+        """
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Count of calls waiting for free worker
+        """
+        return max(self._pending - self._max_workers, 0)
+
+    @property
+    def wait_time(self) -> Histogram:
+        return self._wait_time
+
+    def stats(self) -> dict:
+        return {
+            'kind': self._kind,
+            'max_workers': self._max_workers,
+            'pending': self.pending,
+            'queue_depth': self.queue_depth,
+            'wait_time': self._wait_time.snapshot()
+        }
+
+
+########################################################
+
+async def run_in_executor(executor: Optional[MeteredExecutor],
+                          func: Callable,
+                          **kwargs: Any) -> Any:
+    """
+    Run func in executor, or in current thread if executor is None
+    """
+    if executor is None:
+        return func(**kwargs)
+    return await executor.run(func, **kwargs)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+    metrics
+    ~~~~~~~~~~~~~~~
+  
+    Lightweight in-process metrics.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# upper bounds of buckets (in sec.)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets.
+    All memory is allocated on creation, observe does not allocate
+    """
+    __slots__ = ('_bounds', '_counts', '_sum', '_count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: sorted upper bounds of buckets
+        """
+        self._bounds = tuple(buckets)
+        # the last bucket is +Inf
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+        self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def snapshot(self) -> dict:
+        """
+        Returns state of histogram.
+        Buckets are cumulative (as in Prometheus): count of values less or equal to bound
+        """
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + (float('inf'),), self._counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+
+        return {
+            'buckets': buckets,
+            'sum': self._sum,
+            'count': self._count
+        }
+
+
+########################################################
+
+
+class RequestStats:
+    """
+    Latency histograms of requests by route, method and status.
+    Histogram is allocated once for each key, on its first request
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: sorted upper bounds of buckets (in sec.)
+        """
+        self._buckets = tuple(buckets)
+        self._histograms: Dict[Tuple[str, str, int], Histogram] = {}
+
+    def observe(self, route: str, method: str, status: int, duration: float) -> None:
+        key = (route, method, status)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(self._buckets)
+        histogram.observe(duration)
+
+    def items(self) -> Iterator[Tuple[Tuple[str, str, int], Histogram]]:
+        """
+        Pairs of (route, method, status) and histogram
+        """
+        return iter(list(self._histograms.items()))
+
+    def snapshot(self) -> List[dict]:
+        """
+        Returns state of all histograms, the slowest (by mean latency) go first
+        """
+        result = []
+        for (route, method, status), histogram in self.items():
+            result.append({
+                'route': route,
+                'method': method,
+                'status': status,
+                'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                **histogram.snapshot()
+            })
+
+        result.sort(key=lambda item: item['mean'], reverse=True)
+        return result
+
+    def clear(self) -> None:
+        self._histograms.clear()
+
+
+########################################################
+
+
+class LoopLagMonitor:
+    """
+    Measures lag of event loop: how late sleep of the background task wakes up.
+    Big lag means there is blocking code in event loop
+    """
+
+    def __init__(self, *,
+                 interval: float = 0.5,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param interval: time (in sec.) between measurements
+        :param buckets: sorted upper bounds of buckets (in sec.)
+        """
+        self._interval = interval
+        self._histogram = Histogram(buckets)
+        self._lag: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self._interval)
+            self._lag = max(time.monotonic() - started - self._interval, 0.0)
+            self._histogram.observe(self._lag)
+
+    @property
+    def lag(self) -> float:
+        """
+        The last measured lag (in sec.)
+        """
+        return self._lag
+
+    @property
+    def histogram(self) -> Histogram:
+        return self._histogram
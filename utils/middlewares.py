@@ -7,37 +7,46 @@
 """
 
 import logging
+import time
 from typing import Union
 
-from aiohttp import web, web_exceptions
+from aiohttp import hdrs, web, web_exceptions
 from aiohttp.web_response import Response
 
 from utils import exceptions as app_exceptions
+from utils.codec import json_response, get_error_body
 
 logger = logging.getLogger(__name__)
 
 
-def _error_http_response(status: int,
+def _error_http_response(request: web.Request,
+                         status: int,
                          reason: str = None,
                          errors: Union[None, str, dict] = None) -> Response:
     """
     Return aiohttp response with error and pass payload/reason into it.
+    Body of error without details is encoded only once (see get_error_body)
 
+    :param request: current request
     :param status: Error status code
     :param reason: error's reason
     :param errors: description of error/errors
     :return None
     """
+    if not errors:
+        return web.Response(body=get_error_body(status, reason),
+                            status=status,
+                            content_type='application/json')
+
     text_dict = {}
 
     if reason is not None:
         text_dict['reason'] = reason
 
-    if errors:
-        text_dict['details'] = errors  # type: ignore
+    text_dict['details'] = errors  # type: ignore
 
-    return web.json_response(text_dict,
-                             status=status)
+    return json_response(request, text_dict,
+                         status=status)
 
 
 def _make_error_reason_string(error_text: str) -> str:
@@ -49,42 +58,81 @@ def _make_error_reason_string(error_text: str) -> str:
     return f'ERR_{error_text.upper().replace(" ", "_")}'
 
 
+def _internal_error_response(request: web.Request, err: Exception) -> Response:
+    """
+    Log unexpected exception and return response with 500 status
+    """
+    detail = str(err) if request.app['config']['debug'] else None
+    logger.exception(f'Internal Server Error: {err}')
+    return _error_http_response(request=request,
+                                status=web_exceptions.HTTPInternalServerError.status_code,
+                                reason=app_exceptions.ErrorInternalServer._reason,
+                                errors=detail)
+
+
+# route of requests which do not match any resource
+_UNMATCHED_ROUTE = '<unmatched>'
+# method of requests with non-standard methods, so clients could not add keys of stats
+_OTHER_METHOD = 'OTHER'
+
+
+def _get_route_name(request: web.Request) -> str:
+    """
+    Returns canonical path of matched resource (e.g. /users/{id}),
+    so requests to the same route with different params get the same name
+    """
+    resource = request.match_info.route.resource
+    if resource is None:
+        return _UNMATCHED_ROUTE
+    return resource.canonical
+
+
 @web.middleware
-async def middleware_errors(request, handler):
+async def middleware_timing(request, handler):
+    """
+    Records latency of request into app's RequestStats (key "request_stats")
+    """
+    started = time.monotonic()
+    status = web_exceptions.HTTPInternalServerError.status_code
     try:
         response = await handler(request)
+        status = response.status
         return response
+    except web_exceptions.HTTPException as err:
+        status = err.status_code
+        raise
+    finally:
+        request_stats = request.config_dict.get('request_stats')
+        if request_stats is not None:
+            method = request.method if request.method in hdrs.METH_ALL else _OTHER_METHOD
+            request_stats.observe(_get_route_name(request), method, status,
+                                  time.monotonic() - started)
 
-    except app_exceptions.ErrorBadRequest as err:  # 400
-        return _error_http_response(status=web_exceptions.HTTPBadRequest.status_code,
-                                    reason=err.reason,
-                                    errors=err.detail)
 
-    ########################################################
-
-    except app_exceptions.ErrorAuth as err:  # 401
-        return _error_http_response(status=web_exceptions.HTTPUnauthorized.status_code,
-                                    reason=err.reason,
-                                    errors=err.detail)
+@web.middleware
+async def middleware_errors(request, handler):
+    try:
+        response = await handler(request)
+        return response
 
-    ########################################################
+    except app_exceptions.ExceptionEx as err:  # 400, 401, 404 etc, see status_code of exception
+        # not Http exceptions and server errors are logged
+        if err.status_code is None or err.status_code >= 500:
+            return _internal_error_response(request, err)
 
-    except app_exceptions.ErrorNotFound as err:  # 404
-        return _error_http_response(status=web_exceptions.HTTPNotFound.status_code,
+        return _error_http_response(request=request,
+                                    status=err.status_code,
                                     reason=err.reason,
                                     errors=err.detail)
 
     ########################################################
 
     except web_exceptions.HTTPClientError as err:
-        return _error_http_response(status=err.status_code,
+        return _error_http_response(request=request,
+                                    status=err.status_code,
                                     reason=_make_error_reason_string(err.reason))
 
     ########################################################
 
     except Exception as err:  # pragma: no cover # 500
-        detail = str(err) if request.app['config']['debug'] else None
-        logger.exception(f'Internal Server Error: {err}')
-        return _error_http_response(status=web_exceptions.HTTPInternalServerError.status_code,
-                                    reason=app_exceptions.ErrorInternalServer._reason,
-                                    errors=detail)
+        return _internal_error_response(request, err)
@@ -7,13 +7,13 @@
 """
 
 import logging
-import json
 from typing import Union, Callable
 
 from aiohttp import web_exceptions, web
 from aiohttp.web_response import StreamResponse, Response
 
 from utils import exceptions as app_exceptions
+from utils.codec import read_json_body
 
 logger = logging.getLogger(__name__)
 
@@ -33,8 +33,8 @@ class JsonRequired:
 
         if method in data_methods:
             try:
-                self.request['json'] = await self.request.json()  # type: ignore
-            except json.decoder.JSONDecodeError:
+                self.request['json'] = await read_json_body(self.request)  # type: ignore
+            except ValueError:
                 raise app_exceptions.ErrorBadRequestJson
 
     ########################################################
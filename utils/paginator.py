@@ -8,21 +8,73 @@
     How to use:
     1. Create Paginator object
     2. Create Page object via instance of Paginator
+
+    Paginator works in two modes:
+    - "page": classic page number pagination (LIMIT/OFFSET), fine for small tables
+    - "cursor": keyset pagination, the client passes opaque cursor from previous page.
+      Latency does not depend on how deep the client goes
+
+    Count of rows (for "page" mode) is calculated by one of strategies:
+    - "exact": SELECT count(*) with filters on each request
+    - "estimate": planner estimate (pg_class.reltuples or EXPLAIN), cheap but approximate
+    - "cached": exact count cached for a while, keyed by table and filters
+    - "window": exact count read together with rows (count(*) OVER ()) in one query
 """
 
+import base64
+import binascii
 import collections
+import json
 import logging
 import sqlalchemy as sa
 from math import ceil
 from sqlalchemy import sql, desc, asc
-from typing import Any, Optional, List
+from typing import Any, Dict, Optional, List
 from aiopg.sa.connection import SAConnection
 from aiopg.sa.result import ResultProxy
 
-from utils.validate import validate_schema
+from utils import exceptions as app_exceptions
+from utils.cache import TTLCache
+from utils.db import compile_query
+from utils.validate import validate_schema, SchemaValidator
 
 logger = logging.getLogger(__name__)
 
+_CURSOR_NEXT = 'next'
+_CURSOR_PREV = 'prev'
+# label of total rows column for "window" count strategy
+_TOTAL_LABEL = '_total_count'
+
+
+def _encode_cursor(*, direction: str, sort_value: Any, pk_value: Any) -> str:
+    """
+    Pack seek key into opaque string for client
+    :param direction: direction of scan ("next" or "prev")
+    :param sort_value: value of sort column
+    :param pk_value: value of primary key
+    :return: urlsafe string
+    """
+    raw = json.dumps([direction, sort_value, pk_value], default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """
+    Unpack cursor received from client
+    :param cursor: string from _encode_cursor
+    :return: (direction, sort_value, pk_value)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        direction, sort_value, pk_value = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise app_exceptions.ValidateDataError({'cursor': ['Invalid cursor']})
+
+    if direction not in (_CURSOR_NEXT, _CURSOR_PREV):
+        raise app_exceptions.ValidateDataError({'cursor': ['Invalid cursor']})
+
+    return direction, sort_value, pk_value
+
 
 ########################################################
 
@@ -35,23 +87,49 @@ class Paginator:
     _DEFAULT_PAGE: int = 1
     _DEFAULT_ORDER_BY: str = 'asc'
 
+    MODE_PAGE: str = 'page'
+    MODE_CURSOR: str = 'cursor'
+
+    COUNT_EXACT: str = 'exact'
+    COUNT_ESTIMATE: str = 'estimate'
+    COUNT_CACHED: str = 'cached'
+    COUNT_WINDOW: str = 'window'
+
+    _DEFAULT_COUNT_CACHE_TTL: float = 30
+    # shared between all paginators in the process
+    _count_cache: TTLCache = TTLCache(max_size=1024, ttl=_DEFAULT_COUNT_CACHE_TTL)
+    # validators of query for each table
+    _validators: Dict[Any, SchemaValidator] = {}
+
     def __init__(self, *,
                  conn: SAConnection,
                  table: Any,
                  query: Optional[dict] = None,
-                 fields_select: Optional[List[str]] = None):
+                 fields_select: Optional[List[str]] = None,
+                 mode: str = MODE_PAGE,
+                 count_strategy: str = COUNT_EXACT,
+                 count_cache_ttl: Optional[float] = None):
         """
         :param conn: SAConnection object
         :param table: SQLAlchemy core table
         :param query: page, limit and filters. Describe of dict is in "_convert_query" method
         :param fields_select: list fields for select
+        :param mode: "page" for page number pagination, "cursor" for keyset pagination
+        :param count_strategy: how to count rows: "exact", "estimate", "cached" or "window"
+        :param count_cache_ttl: life time of cached count (in sec.), for "cached" strategy only
         """
+        assert mode in (self.MODE_PAGE, self.MODE_CURSOR)
+        assert count_strategy in (self.COUNT_EXACT, self.COUNT_ESTIMATE,
+                                  self.COUNT_CACHED, self.COUNT_WINDOW)
         if query is None:
             query = {}
         query = self._convert_query(table=table, raw_query=query)
 
         self._table: Any = table
         self._conn: SAConnection = conn
+        self._mode: str = mode
+        self._count_strategy: str = count_strategy
+        self._count_cache_ttl: Optional[float] = count_cache_ttl
         #
         self._limit: int = int(query['limit'])
         self._page: int = int(query['page'])
@@ -59,9 +137,12 @@ class Paginator:
         self._fields_select = fields_select
         self._order_by: str = query['order_by']
         self._sort_by: str = query['sort_by']
+        self._cursor: Optional[str] = query['cursor']
         #
         self._records_count: Optional[int] = None
         self._pages_count: Optional[int] = None
+        # strategy which actually produced records_count
+        self._count_source: Optional[str] = None
 
         logger.debug(f'Limit: {self._limit}. Page: {self._page}. Filters: {self._filters}. '
                      f'Sort by: {self._sort_by}. Order by: {self._order_by}')
@@ -69,12 +150,12 @@ class Paginator:
     ########################################################
 
     @staticmethod
-    def _convert_query(table: Any, raw_query: dict) -> dict:
+    def _build_schema(table: Any) -> dict:
         """
-        Validate and convert query as dict
+        Build jsonschema for query of the table
 
-        :param raw_query: raw dict from request
-        :return query for Paginator
+        :param table: SQLAlchemy core table
+        :return: jsonschema
         """
 
         def get_field_schema(_field: str) -> dict:
@@ -109,6 +190,7 @@ class Paginator:
                 'page': {'type': ['string', 'number'], 'pattern': '^\d+$'},
                 'sort_by': {'type': 'string', 'enum': table_fields},
                 'order_by': {'type': 'string', 'enum': ['asc', 'desc']},
+                'cursor': {'type': ['string', 'null']},
                 'filters': {
                     'type': 'object',
                     'additionalProperties': False,
@@ -116,6 +198,36 @@ class Paginator:
                 }
             }
         }
+        return schema
+
+    @staticmethod
+    def _get_table_validator(table: Any) -> SchemaValidator:
+        """
+        Returns validator for query of the table.
+        Schema is built and checked only once per table in the process
+
+        :param table: SQLAlchemy core table
+        :return: precompiled validator
+        """
+        try:
+            return Paginator._validators[table]
+        except KeyError:
+            pass
+
+        validator = SchemaValidator(Paginator._build_schema(table))
+        Paginator._validators[table] = validator
+        return validator
+
+    @staticmethod
+    def _convert_query(table: Any, raw_query: dict) -> dict:
+        """
+        Validate and convert query as dict
+
+        :param raw_query: raw dict from request
+        :return query for Paginator
+        """
+        validator = Paginator._get_table_validator(table)
+        table_fields = validator.schema['properties']['sort_by']['enum']
 
         query = {
             'limit': raw_query.pop('limit', Paginator._DEFAULT_LIMIT),
@@ -123,10 +235,11 @@ class Paginator:
             # by default we use first field in table
             'sort_by': raw_query.pop('sort_by', table_fields[0]),
             'order_by': raw_query.pop('order_by', Paginator._DEFAULT_ORDER_BY),
+            'cursor': raw_query.pop('cursor', None),
             'filters': {**raw_query}
         }
 
-        validate_schema(jsonschema=schema, data=query)
+        validate_schema(validator=validator, data=query)
         return query
 
     ########################################################
@@ -161,6 +274,63 @@ class Paginator:
         res = await cursor.fetchone()
         return res['count']
 
+    async def _get_estimate_rows(self) -> Optional[int]:
+        """
+        Returns planner's estimate of rows count.
+        Without filters uses pg_class.reltuples, otherwise plan of EXPLAIN
+        :return: estimate or None if planner knows nothing about table
+        """
+        if not self._filters:
+            query = sql.text('SELECT reltuples::bigint AS count FROM pg_class '
+                             'WHERE oid = to_regclass(:table_name)')
+            cursor: ResultProxy = await self._conn.execute(query, table_name=self._table.fullname)
+            res = await cursor.fetchone()
+            # table has never been analyzed: -1 on PG >= 14, 0 on older versions.
+            # Empty table also gives 0, exact count of it is cheap anyway
+            if res is None or res['count'] <= 0:
+                return None
+            return res['count']
+
+        query = sql.select([sql.literal_column('1')]) \
+            .select_from(self._table) \
+            .where(sql.and_(*self._get_filters()))
+        query_str, params = compile_query(query)
+
+        cursor = await self._conn.execute(f'EXPLAIN (FORMAT JSON) {query_str}', params)
+        res = await cursor.fetchone()
+        plan = res[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _get_count_cache_key(self) -> tuple:
+        return self._table.fullname, tuple(sorted(self._filters.items()))
+
+    async def _count(self) -> int:
+        """
+        Count rows with configured strategy and remember which strategy has been used
+        """
+        if self._count_strategy == self.COUNT_ESTIMATE:
+            estimate = await self._get_estimate_rows()
+            if estimate is not None:
+                self._count_source = self.COUNT_ESTIMATE
+                return estimate
+
+        elif self._count_strategy == self.COUNT_CACHED:
+            key = self._get_count_cache_key()
+            count = self._count_cache.get(key)
+            if count is not None:
+                self._count_source = self.COUNT_CACHED
+                return count
+
+            count = await self._get_count_rows()
+            self._count_cache.set(key, count, ttl=self._count_cache_ttl)
+            self._count_source = self.COUNT_EXACT
+            return count
+
+        self._count_source = self.COUNT_EXACT
+        return await self._get_count_rows()
+
     async def _get_count_pages(self) -> int:
         """
         Calculate count pages
@@ -176,7 +346,7 @@ class Paginator:
         Calculate common values (count rows, count pages etc)
         :return:
         """
-        self._records_count = await self._get_count_rows()
+        self._records_count = await self._count()
         self._pages_count = await self._get_count_pages()
 
     ########################################################
@@ -194,7 +364,8 @@ class Paginator:
         except ValueError:
             number = 1
 
-        if number > self._pages_count:  # type: ignore
+        # estimate could be less than real count, so real trailing pages have to be reachable
+        if self._count_source != self.COUNT_ESTIMATE and number > self._pages_count:  # type: ignore
             number = self._pages_count  # type: ignore
         if number < 1:
             number = 1
@@ -203,6 +374,18 @@ class Paginator:
 
     ########################################################
 
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def count_source(self) -> str:
+        """
+        Strategy which produced records_count and pages_count
+        """
+        assert self._count_source is not None
+        return self._count_source
+
     @property
     def records_count(self) -> int:
         assert self._records_count is not None
@@ -213,27 +396,145 @@ class Paginator:
         assert self._pages_count is not None
         return self._pages_count
 
+    def _get_fields_to_select(self) -> list:
+        """
+        Columns for select clause
+        """
+        if not self._fields_select:
+            return [self._table]
+        return [self._table.c[field] for field in self._fields_select]
+
+    def _get_pk_column(self) -> Any:
+        """
+        Returns primary key column, it makes seek key unique
+        """
+        pk_columns = list(self._table.primary_key.columns)
+        assert pk_columns, 'Cursor pagination requires table with primary key'
+        return pk_columns[0]
+
+    async def _get_cursor_page(self, *,
+                               cursor: Optional[str] = None) -> 'Page':
+        """
+        Returns page for keyset pagination.
+        Seek key is (sort_by column, primary key), so rows with equal sort values
+        are neither skipped nor duplicated. Sort column has to be NOT NULL.
+        Columns of the seek key are always selected, even if they are not in fields_select.
+
+        :param cursor: cursor from previous page. None for first page
+        :return:
+        """
+        sort_column = self._table.c[self._sort_by]
+        pk_column = self._get_pk_column()
+
+        direction = _CURSOR_NEXT
+        if cursor is not None:
+            direction, sort_value, pk_value = _decode_cursor(cursor)
+
+        # to go backwards scan in opposite order and reverse result afterwards
+        backwards = direction == _CURSOR_PREV
+        scan_desc = (self._order_by == 'desc') != backwards
+
+        fields_to_select = self._get_fields_to_select()
+        if self._fields_select:
+            for column in (sort_column, pk_column):
+                if column.key not in self._fields_select:
+                    fields_to_select.append(column)
+
+        query = sql.select(fields_to_select).limit(self._limit + 1)
+
+        if self._filters:
+            clause = self._get_filters()
+            query = query.where(sql.and_(*clause))
+
+        if cursor is not None:
+            if sort_column is pk_column:
+                seek_key, seek_value = pk_column, pk_value
+            else:
+                seek_key = sql.tuple_(sort_column, pk_column)
+                seek_value = sql.tuple_(sort_value, pk_value)
+            query = query.where(seek_key < seek_value if scan_desc else seek_key > seek_value)
+
+        if scan_desc:
+            query = query.order_by(desc(sort_column), desc(pk_column))
+        else:
+            query = query.order_by(asc(sort_column), asc(pk_column))
+
+        cursor_proxy: ResultProxy = await self._conn.execute(query)
+        records = await cursor_proxy.fetchall()
+
+        has_more = len(records) > self._limit
+        records = records[:self._limit]
+        if backwards:
+            records.reverse()
+
+        if backwards:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, cursor is not None
+
+        next_cursor = prev_cursor = None
+        if records and has_next:
+            next_cursor = _encode_cursor(direction=_CURSOR_NEXT,
+                                         sort_value=records[-1][sort_column.key],
+                                         pk_value=records[-1][pk_column.key])
+        if records and has_prev:
+            prev_cursor = _encode_cursor(direction=_CURSOR_PREV,
+                                         sort_value=records[0][sort_column.key],
+                                         pk_value=records[0][pk_column.key])
+
+        return Page(records=[dict(record) for record in records],
+                    page=1,
+                    paginator=self,
+                    next_cursor=next_cursor,
+                    prev_cursor=prev_cursor)
+
     async def get_page(self, *,
-                       page: Optional[int] = None) -> 'Page':
+                       page: Optional[int] = None,
+                       cursor: Optional[str] = None) -> 'Page':
         """
         Returns data for number page
 
-        :param page: Number of page.
+        :param page: Number of page. Used only in "page" mode
+        :param cursor: Cursor from previous page. Used only in "cursor" mode
         :return:
         """
-        await self._calculate()
+        if self._mode == self.MODE_CURSOR:
+            return await self._get_cursor_page(cursor=cursor or self._cursor)
+
         _page = page or self._page
+        if self._count_strategy == self.COUNT_WINDOW:
+            return await self._get_page_window_count(number=_page)
+
+        await self._calculate()
         page_number = self._validate_page_number(number=_page)
 
-        offset = (page_number - 1) * self._limit
+        query = self._get_page_query(offset=(page_number - 1) * self._limit)
+        cursor: ResultProxy = await self._conn.execute(query)
+        records = await cursor.fetchall()
 
+        page_obj = Page(
+            records=[dict(record) for record in records],
+            page=page_number,
+            paginator=self
+        )
+        return page_obj
+
+    def _get_page_query(self, *, offset: Any, with_total: bool = False) -> Any:
+        """
+        Query for rows of one page
+        :param offset: int or SQL expression for OFFSET
+        :param with_total: add total count of rows (count(*) OVER ()) to each row
+        :return:
+        """
         if self._order_by == 'desc':
             order = desc(self._sort_by)
         else:
             order = asc(self._sort_by)
 
-        fields_to_select = [self._table.c[field] for field in self._fields_select] \
-            if self._fields_select else [self._table]
+        fields_to_select = self._get_fields_to_select()
+        if with_total:
+            fields_to_select.append(sql.func.count().over().label(_TOTAL_LABEL))
+
         query = sql.select(fields_to_select) \
             .offset(offset) \
             .limit(self._limit)\
@@ -243,12 +544,46 @@ class Paginator:
             clause = self._get_filters()
             query = query.where(sql.and_(*clause))
 
+        return query
+
+    async def _get_page_window_count(self, *, number: Any) -> 'Page':
+        """
+        Returns page and total count of rows in one round trip to database.
+        If page is past the end there are no rows to read total from,
+        in this case one more query reads the last page (as _validate_page_number does)
+
+        :param number: number of page
+        :return:
+        """
+        try:
+            number = max(int(number), 1)
+        except ValueError:
+            number = 1
+
+        query = self._get_page_query(offset=(number - 1) * self._limit, with_total=True)
         cursor: ResultProxy = await self._conn.execute(query)
         records = await cursor.fetchall()
 
+        if not records and number > 1:
+            count_query = sql.select([sql.func.count()]).select_from(self._table)
+            if self._filters:
+                count_query = count_query.where(sql.and_(*self._get_filters()))
+            # offset of the last page, calculated by database
+            last_offset = sql.func.greatest(count_query.as_scalar() - 1, 0) \
+                / self._limit * self._limit
+
+            query = self._get_page_query(offset=last_offset, with_total=True)
+            cursor = await self._conn.execute(query)
+            records = await cursor.fetchall()
+
+        self._records_count = records[0][_TOTAL_LABEL] if records else 0
+        self._pages_count = await self._get_count_pages()
+        self._count_source = self.COUNT_WINDOW
+
         page_obj = Page(
-            records=records,
-            page=page_number,
+            records=[{k: v for k, v in record.items() if k != _TOTAL_LABEL}
+                     for record in records],
+            page=self._validate_page_number(number=number),
             paginator=self
         )
         return page_obj
@@ -257,13 +592,21 @@ class Paginator:
 ########################################################
 
 class Page(collections.abc.Sequence):
+    """
+    One page of records. Records are dicts in all modes and with all count strategies
+    """
+
     def __init__(self, *,
                  records: list,
                  page: int,
-                 paginator: Paginator) -> None:
+                 paginator: Paginator,
+                 next_cursor: Optional[str] = None,
+                 prev_cursor: Optional[str] = None) -> None:
         self._records = records
         self._page = page
         self._paginator = paginator
+        self._next_cursor = next_cursor
+        self._prev_cursor = prev_cursor
 
     def to_dict(self) -> dict:
         """
@@ -273,11 +616,22 @@ class Page(collections.abc.Sequence):
         # first serialize all records
         for record in self._records:
             records.append(dict(record))
+
+        if self._paginator.mode == Paginator.MODE_CURSOR:
+            return {
+                'records': records,
+                'next_cursor': self._next_cursor,
+                'prev_cursor': self._prev_cursor,
+                'has_prev': self.has_prev(),
+                'has_next': self.has_next()
+            }
+
         return {
             'records': records,
             'pages_count': self._paginator.pages_count,
             'page': self.page,
             'records_count': self._paginator.records_count,
+            'count_source': self._paginator.count_source,
             'has_prev': self.has_prev(),
             'has_next': self.has_next()
         }
@@ -294,6 +648,14 @@ class Page(collections.abc.Sequence):
     def records(self) -> list:
         return self._records
 
+    @property
+    def next_cursor(self) -> Optional[str]:
+        return self._next_cursor
+
+    @property
+    def prev_cursor(self) -> Optional[str]:
+        return self._prev_cursor
+
     def __len__(self) -> int:
         return len(self._records)
 
@@ -301,13 +663,30 @@ class Page(collections.abc.Sequence):
         return self._records[i]
 
     def has_next(self) -> bool:
+        if self._paginator.mode == Paginator.MODE_CURSOR:
+            return self._next_cursor is not None
+        if self._paginator.count_source == Paginator.COUNT_ESTIMATE:
+            # count of pages is approximate, full page means there could be next one
+            return len(self._records) == self._paginator._limit
         return self._page < self._paginator.pages_count  # type: ignore
 
-    def get_next_page(self) -> int:
+    def get_next_page(self) -> Optional[int]:
+        """
+        Number of next page, None in cursor mode (pages have no numbers, see next_cursor)
+        """
+        if self._paginator.mode == Paginator.MODE_CURSOR:
+            return None
         return self._paginator._validate_page_number(number=self._page + 1)
 
     def has_prev(self) -> bool:
+        if self._paginator.mode == Paginator.MODE_CURSOR:
+            return self._prev_cursor is not None
         return self._page > 1
 
-    def get_prev_page(self) -> int:
+    def get_prev_page(self) -> Optional[int]:
+        """
+        Number of previous page, None in cursor mode (pages have no numbers, see prev_cursor)
+        """
+        if self._paginator.mode == Paginator.MODE_CURSOR:
+            return None
         return self._paginator._validate_page_number(number=self._page - 1)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+    test_cache
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+import time
+
+from utils.cache import TTLCache, BoundedIntSet
+
+
+def test_ttl_cache_get_set(faker):
+    cache = TTLCache(max_size=10, ttl=60)
+    key, value = faker.word(), faker.random_int()
+
+    assert cache.get(key) is None
+    cache.set(key, value)
+    assert cache.get(key) == value
+    assert key in cache
+
+    cache.delete(key)
+    assert key not in cache
+
+
+def test_ttl_cache_expired(faker):
+    cache = TTLCache(max_size=10, ttl=60)
+    key = faker.word()
+
+    cache.set(key, faker.random_int(), ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_max_size():
+    cache = TTLCache(max_size=3, ttl=60)
+    for i in range(3):
+        cache.set(i, i)
+
+    # 0 becomes the most recently used
+    cache.get(0)
+    cache.set(3, 3)
+
+    assert len(cache) == 3
+    assert 0 in cache
+    assert 1 not in cache
+
+
+def test_bounded_int_set():
+    values = BoundedIntSet(max_entries=100, merge_threshold=4)
+    values.update([10, 3, 7, 7, 1, 20])
+
+    assert len(values) == 5
+    for value in (1, 3, 7, 10, 20):
+        assert value in values
+    assert 2 not in values
+    assert 'abc' not in values
+
+    values.discard(7)
+    values.discard(20)
+    assert 7 not in values
+    assert 20 not in values
+    assert len(values) == 3
+
+
+def test_bounded_int_set_max_entries():
+    values = BoundedIntSet(max_entries=5, merge_threshold=2)
+    values.update(range(10))
+
+    # the smallest entries are dropped
+    assert len(values) == 5
+    assert list(range(5)) == [value for value in range(5) if value not in values]
+    assert all(value in values for value in range(5, 10))
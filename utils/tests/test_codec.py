@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+    test_codec
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+import pytest
+from datetime import datetime, timezone
+
+from utils.codec import JsonCodec, default_codec, get_error_body, orjson, ujson
+
+BACKENDS = [JsonCodec.BACKEND_JSON] + \
+           ([JsonCodec.BACKEND_ORJSON] if orjson is not None else []) + \
+           ([JsonCodec.BACKEND_UJSON] if ujson is not None else [])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_json_codec(backend, faker):
+    codec = JsonCodec(backend)
+    data = {'id': faker.random_int(), 'username': faker.user_name(), 'name': 'Имя'}
+
+    encoded = codec.dumps_bytes(data)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == data
+    assert codec.loads(codec.dumps(data)) == data
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_json_codec_datetime(backend):
+    codec = JsonCodec(backend)
+    created_at = datetime(2019, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+    assert codec.loads(codec.dumps({'created_at': created_at})) == {
+        'created_at': created_at.isoformat()
+    }
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_json_codec_invalid_json(backend):
+    with pytest.raises(ValueError):
+        JsonCodec(backend).loads(b'{"id": ')
+
+
+def test_json_codec_auto():
+    codec = JsonCodec()
+    assert codec.backend in BACKENDS
+
+    with pytest.raises(ValueError):
+        JsonCodec('unknown')
+
+
+def test_get_error_body_cached():
+    body = get_error_body(401, 'ERR_TEST')
+
+    assert body == default_codec.dumps_bytes({'reason': 'ERR_TEST'})
+    assert get_error_body(401, 'ERR_TEST') is body
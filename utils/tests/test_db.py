@@ -6,6 +6,9 @@
 
 """
 
+import asyncio
+import enum
+import psycopg2
 import pytest
 import sqlalchemy as sa
 from math import ceil
@@ -15,15 +18,26 @@ from aiopg.sa.connection import SAConnection
 from aiopg.sa.result import ResultProxy
 from aiohttp import web
 
-from utils.db import get_all_objects, get_count
+from utils import exceptions as app_exceptions
+from utils.db import get_all_objects, get_one_object, get_count, CompiledQuery, PreparedQuery, \
+    iterate_objects, bulk_create_objects, get_query_cache_info, clear_query_cache, create_db_engine, \
+    DbRouter, aclosing
 
 metadata = MetaData()
 
+
+class Kind(enum.Enum):
+    first = 'first'
+    second = 'second'
+
+
 db_test = sa.Table(
     'db_test', metadata,
     sa.Column('id', sa.Integer, primary_key=True),
     sa.Column('sequence', sa.String, unique=True, nullable=False),
-    sa.Column('some_data', sa.String, nullable=False)
+    sa.Column('some_data', sa.String, nullable=False),
+    # type with bind and result processors
+    sa.Column('kind', sa.Enum(Kind, native_enum=False), nullable=True)
 )
 
 COUNT_DATA: int = 500  # count data in the table
@@ -61,6 +75,24 @@ async def test_get_all_objects(app, database, db_data):
         assert len(objects) == COUNT_DATA
 
 
+async def test_get_all_objects_type_processors(app, database, db_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        await conn.execute(db_test.update()
+                                  .where(db_test.c.sequence == 'sequence_1')
+                                  .values(kind=Kind.first))
+
+        objects = await get_all_objects(conn=conn,
+                                        table=db_test,
+                                        where={'kind': Kind.first})
+        assert len(objects) == 1
+        assert objects[0]['kind'] is Kind.first
+
+        count = await get_count(conn=conn,
+                                table=db_test,
+                                where={'kind': Kind.first})
+        assert count == 1
+
+
 async def test_get_all_objects_with_contains(app, database, db_data):
     async with app['db'].acquire() as conn:  # type: SAConnection
         objects = await get_all_objects(conn=conn,
@@ -71,6 +103,131 @@ async def test_get_all_objects_with_contains(app, database, db_data):
         assert len(objects) == 11
 
 
+async def test_get_all_objects_query_cache(app, database, db_data):
+    clear_query_cache()
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        for i in range(3):
+            objects = await get_all_objects(conn=conn,
+                                            table=db_test,
+                                            where={'sequence': f'sequence_{i}'})
+            assert len(objects) == 1
+            assert objects[0]['sequence'] == f'sequence_{i}'
+
+    info = get_query_cache_info()
+    assert info['misses'] == 1
+    assert info['hits'] == 2
+
+
+async def test_prepared_query(app, database, db_data):
+    query = PreparedQuery(
+        name='test_select_db_test_by_sequence',
+        query=sa.select([db_test]).where(db_test.c.sequence == sa.bindparam('sequence')).limit(1)
+    )
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        for i in range(3):
+            cursor: ResultProxy = await query.execute(conn, sequence=f'sequence_{i}')
+            obj = await cursor.fetchone()
+            assert obj['sequence'] == f'sequence_{i}'
+
+        # statement has been dropped on server, it has to be prepared again
+        await conn.execute(f'DEALLOCATE {query.name}')
+        cursor = await query.execute(conn, sequence='sequence_1')
+        obj = await cursor.fetchone()
+        assert obj['sequence'] == 'sequence_1'
+
+
+async def test_prepared_query_like_pattern(app, database, db_data):
+    # percent sign is a part of SQL, not of parameter
+    query = PreparedQuery(
+        name='test_count_db_test_like',
+        query=sa.select([sa.func.count()]).select_from(db_test).where(sa.and_(
+            db_test.c.sequence.like(sa.literal_column("'sequence_1%'")),
+            db_test.c.id > sa.bindparam('id')
+        ))
+    )
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        cursor: ResultProxy = await query.execute(conn, id=0)
+        # sequence_1, sequence_10..19, sequence_100..199
+        assert await cursor.scalar() == 111
+
+
+async def test_prepared_query_deallocated_in_transaction(app, database, db_data):
+    query = PreparedQuery(
+        name='test_select_db_test_in_transaction',
+        query=sa.select([db_test]).where(db_test.c.sequence == sa.bindparam('sequence'))
+    )
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        await query.execute(conn, sequence='sequence_1')
+        await conn.execute(f'DEALLOCATE {query.name}')
+
+        # failed statement aborts transaction, so it is not retried
+        with pytest.raises(psycopg2.ProgrammingError):
+            async with conn.begin():
+                await query.execute(conn, sequence='sequence_1')
+
+        # and is prepared again out of transaction
+        cursor: ResultProxy = await query.execute(conn, sequence='sequence_1')
+        obj = await cursor.fetchone()
+        assert obj['sequence'] == 'sequence_1'
+
+
+async def test_iterate_objects(app, database, db_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        objects = [obj async for obj in iterate_objects(conn=conn,
+                                                        table=db_test,
+                                                        chunk_size=COUNT_DATA // 3)]
+        assert len(objects) == COUNT_DATA
+        assert len({obj['id'] for obj in objects}) == COUNT_DATA
+
+        objects = [obj async for obj in iterate_objects(conn=conn,
+                                                        table=db_test,
+                                                        contains={'sequence': 'sequence_5'},
+                                                        chunk_size=5)]
+        assert len(objects) == 11
+
+
+async def test_iterate_objects_break(app, database, db_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        async with aclosing(iterate_objects(conn=conn, table=db_test, chunk_size=5)) as objects:
+            async for _ in objects:
+                break
+        assert not conn.in_transaction
+
+        # connection is usable after early break
+        count = await get_count(conn=conn, table=db_test)
+        assert count == COUNT_DATA
+
+
+async def test_get_one_object(app, database, db_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        obj = await get_one_object(conn=conn,
+                                   table=db_test,
+                                   where={'sequence': 'sequence_1'})
+        assert obj['sequence'] == 'sequence_1'
+
+        obj = await get_one_object(conn=conn,
+                                   table=db_test,
+                                   where={'id': obj['id']})
+        assert obj['sequence'] == 'sequence_1'
+
+
+async def test_get_one_object_fail(app, database, db_data, faker):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        with pytest.raises(app_exceptions.DoesNotExist):
+            await get_one_object(conn=conn,
+                                 table=db_test,
+                                 where={'sequence': faker.uuid4()})
+
+        with pytest.raises(app_exceptions.MultipleObjectsReturned):
+            await get_one_object(conn=conn,
+                                 table=db_test,
+                                 where={})
+
+
 async def test_get_count(app, database, db_data):
     async with app['db'].acquire() as conn:  # type: SAConnection
         count = await get_count(conn=conn,
@@ -98,3 +255,127 @@ async def test_get_count_with_contains(app, database, db_data):
                                 })
         assert count == 11
 
+
+async def test_compiled_query(app, database, db_data):
+    query = CompiledQuery(
+        sa.select([db_test]).where(db_test.c.sequence == sa.bindparam('sequence')).limit(1)
+    )
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        cursor: ResultProxy = await query.execute(conn, sequence='sequence_1')
+        objects = await cursor.fetchall()
+        assert len(objects) == 1
+        assert objects[0]['sequence'] == 'sequence_1'
+
+        cursor = await query.execute(conn, sequence='sequence_2')
+        objects = await cursor.fetchall()
+        assert objects[0]['sequence'] == 'sequence_2'
+
+
+async def test_bulk_create_objects(app, database, db_data, faker):
+    data = [{'sequence': f'bulk_{i}', 'some_data': faker.word()} for i in range(25)]
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        count = await bulk_create_objects(conn=conn,
+                                          table=db_test,
+                                          data=data[:20],
+                                          batch_size=7)
+        assert count == 20
+
+        objects = await bulk_create_objects(conn=conn,
+                                            table=db_test,
+                                            data=data[20:],
+                                            returning=True)
+        # order of returned rows is not guaranteed
+        assert {obj['sequence'] for obj in objects} == {obj['sequence'] for obj in data[20:]}
+
+        count = await get_count(conn=conn,
+                                table=db_test,
+                                contains={'sequence': 'bulk_'})
+        assert count == len(data)
+
+
+async def test_bulk_create_objects_atomic(app, database, db_data, faker):
+    data = [{'sequence': f'bulk_{i}', 'some_data': faker.word()} for i in range(20)]
+    # the last batch violates unique constraint
+    data.append({'sequence': 'sequence_1', 'some_data': faker.word()})
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        with pytest.raises(psycopg2.IntegrityError):
+            await bulk_create_objects(conn=conn,
+                                      table=db_test,
+                                      data=data,
+                                      batch_size=7)
+
+        count = await get_count(conn=conn,
+                                table=db_test,
+                                contains={'sequence': 'bulk_'})
+        assert count == 0
+
+
+async def test_db_engine_stats(app, database):
+    db = app['db']
+    stats = db.stats()
+    assert stats['waiters'] == 0
+
+    async with db.acquire() as conn:  # type: SAConnection
+        await conn.execute('SELECT 1')
+        stats = db.stats()
+        assert stats['in_use'] == 1
+        assert stats['in_use'] + stats['idle'] == stats['size']
+
+    stats = db.stats()
+    assert stats['in_use'] == 0
+    assert stats['acquire_wait']['count'] >= 1
+
+
+async def test_db_engine_acquire_timeout(app):
+    db = await create_db_engine(minsize=1, maxsize=1, acquire_timeout=0.1,
+                                **{key: value for key, value in app['config']['database'].items()
+                                   if key in ('user', 'password', 'database', 'host', 'port')})
+
+    try:
+        async with db.acquire():
+            with pytest.raises(asyncio.TimeoutError):
+                async with db.acquire():
+                    pass
+
+        assert db.stats()['acquire_timeouts'] == 1
+        assert db.waiters == 0
+    finally:
+        db.close()
+        await db.wait_closed()
+
+
+async def test_db_router_round_robin(app):
+    primary = app['db'].primary
+    router = DbRouter(primary=primary, replicas=[primary, primary])
+
+    assert router._get_replicas_order() == [0, 1]
+    assert router._get_replicas_order() == [1, 0]
+    assert router._get_replicas_order() == [0, 1]
+
+    async with router.acquire_read() as conn:  # type: SAConnection
+        result = await conn.scalar('SELECT 1')
+        assert result == 1
+
+
+async def test_db_router_fallback_to_primary(app):
+    config = {key: value for key, value in app['config']['database'].items()
+              if key in ('user', 'password', 'database', 'host', 'port')}
+    broken_replica = await create_db_engine(**{**config, 'minsize': 0, 'port': 1})
+    router = DbRouter(primary=app['db'].primary,
+                      replicas=[broken_replica],
+                      selection=DbRouter.SELECTION_LEAST_BUSY)
+
+    try:
+        async with router.acquire_read() as conn:  # type: SAConnection
+            result = await conn.scalar('SELECT 1')
+            assert result == 1
+
+        assert router.stats()['replica_fallbacks'] == 1
+        # failed replica is skipped for a while
+        assert router._get_replicas_order() == []
+    finally:
+        broken_replica.close()
+        await broken_replica.wait_closed()
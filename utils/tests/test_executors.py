@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+    test_executors
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+from apps.authenticate.utils import generate_password_hash, validate_password
+from utils.executors import MeteredExecutor, run_in_executor
+
+
+async def test_metered_executor_thread(loop, faker):
+    executor = MeteredExecutor(kind=MeteredExecutor.KIND_THREAD, max_workers=2)
+    password = faker.password()
+
+    password_hash = await executor.run(generate_password_hash, password=password)
+    assert await executor.run(validate_password, password=password, password_hash=password_hash)
+
+    stats = executor.stats()
+    assert stats['pending'] == 0
+    assert stats['queue_depth'] == 0
+    assert stats['wait_time']['count'] == 2
+    executor.shutdown()
+
+
+async def test_metered_executor_process(loop, faker):
+    executor = MeteredExecutor(kind=MeteredExecutor.KIND_PROCESS, max_workers=1)
+    password = faker.password()
+
+    password_hash = await executor.run(generate_password_hash, password=password)
+    assert validate_password(password=password, password_hash=password_hash)
+    executor.shutdown()
+
+
+async def test_run_in_executor_without_executor(loop, faker):
+    password = faker.password()
+
+    password_hash = await run_in_executor(None, generate_password_hash, password=password)
+    assert validate_password(password=password, password_hash=password_hash)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+    test_metrics
+    ~~~~~~~~~~~~~~~
+  
+
+"""
+
+import asyncio
+import pytest
+
+from utils.metrics import Histogram, RequestStats, LoopLagMonitor
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 4
+    assert snapshot['sum'] == pytest.approx(5.65)
+    assert snapshot['buckets'] == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+
+
+def test_request_stats():
+    stats = RequestStats(buckets=(0.1, 1.0))
+    stats.observe('/users/{id}', 'GET', 200, 0.05)
+    stats.observe('/users/{id}', 'GET', 200, 0.15)
+    stats.observe('/login', 'POST', 401, 0.5)
+
+    snapshot = stats.snapshot()
+    assert len(snapshot) == 2
+
+    # the slowest route goes first
+    assert snapshot[0]['route'] == '/login'
+    assert snapshot[0]['status'] == 401
+    assert snapshot[1]['count'] == 2
+    assert snapshot[1]['mean'] == pytest.approx(0.1)
+    assert snapshot[1]['buckets'] == [(0.1, 1), (1.0, 2), (float('inf'), 2)]
+
+    stats.clear()
+    assert stats.snapshot() == []
+
+
+async def test_loop_lag_monitor(loop):
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert monitor.histogram.count > 0
+    assert monitor.lag >= 0
@@ -48,6 +48,11 @@ class TestViewOnlyPost(web.View):
         return web.Response(status=web_exceptions.HTTPOk.status_code)
 
 
+class TestViewInternalError(web.View):
+    async def post(self):
+        raise app_exceptions.ErrorInternalServer
+
+
 class TestViewBadRequest(web.View):
     async def post(self):
         raise app_exceptions.ErrorBadRequest({'error': 'error'})
@@ -61,6 +66,8 @@ class TestViewBadRequest(web.View):
 async def api_client_test_app(loop, aiohttp_client):
     # app = web.Application()
     app = await create_app()
+    app['max_json_body_size'] = 1024
+    app['config'] = {'debug': False}
     app.add_routes([
         web.view('/success', TestViewSuccess, name='success'),
         web.view('/error_request', TestViewErrorRequest, name='error_request'),
@@ -68,7 +75,8 @@ async def api_client_test_app(loop, aiohttp_client):
         web.view('/not_found', TestViewNotFound, name='not_found'),
         web.view('/json_in_request', TestViewJsonInRequest, name='json_in_request'),
         web.view('/only_post', TestViewOnlyPost, name='only_post'),
-        web.view('/bad_request', TestViewBadRequest, name='bad_request')
+        web.view('/bad_request', TestViewBadRequest, name='bad_request'),
+        web.view('/internal_error', TestViewInternalError, name='internal_error')
     ])
     return await aiohttp_client(app)
 
@@ -117,6 +125,25 @@ async def test_mixin_json_in_post_request_fail_no_json(api_client_test_app, fake
     assert res.status == web_exceptions.HTTPBadRequest.status_code
 
 
+async def test_mixin_json_in_post_request_fail_invalid_json(api_client_test_app):
+    res = await api_client_test_app.post('/json_in_request', data=b'{"key": ',
+                                         headers={'Content-Type': 'application/json'})
+    ans = await res.json()
+
+    assert res.status == web_exceptions.HTTPBadRequest.status_code
+    assert ans['reason'] == app_exceptions.ErrorBadRequestJson._reason
+
+
+async def test_mixin_json_in_post_request_fail_too_large(api_client_test_app):
+    json_request = {'key': 'x' * 2048}
+
+    res = await api_client_test_app.post('/json_in_request', json=json_request)
+    ans = await res.json()
+
+    assert res.status == web_exceptions.HTTPRequestEntityTooLarge.status_code
+    assert ans['reason'] == app_exceptions.ErrorBadRequestBodyTooLarge._reason
+
+
 async def test_mixin_not_allowed_method(api_client_test_app):
     res = await api_client_test_app.get('/only_post')
     ans = await res.json()
@@ -129,3 +156,48 @@ async def test_mixin_bad_request(api_client_test_app):
     ans = await res.json()
 
     assert res.status == web_exceptions.HTTPBadRequest.status_code
+
+
+async def test_error_response_without_details(api_client_test_app):
+    res = await api_client_test_app.post('/not_found', json={})
+    ans = await res.json()
+
+    assert res.status == web_exceptions.HTTPNotFound.status_code
+    assert ans == {'reason': app_exceptions.ErrorNotFound._reason}
+
+
+async def test_error_response_with_details(api_client_test_app):
+    res = await api_client_test_app.post('/bad_request')
+    ans = await res.json()
+
+    assert ans == {'reason': app_exceptions.ErrorBadRequest._reason,
+                   'details': {'error': 'error'}}
+
+
+async def test_error_internal_server_logged(api_client_test_app, caplog):
+    res = await api_client_test_app.post('/internal_error')
+    ans = await res.json()
+
+    assert res.status == web_exceptions.HTTPInternalServerError.status_code
+    assert ans == {'reason': app_exceptions.ErrorInternalServer._reason}
+    assert any(record.levelname == 'ERROR' for record in caplog.records)
+
+
+async def test_request_stats(api_client_test_app):
+    await api_client_test_app.post('/success', json={})
+    await api_client_test_app.post('/not_found', json={})
+
+    snapshot = api_client_test_app.server.app['request_stats'].snapshot()
+    keys = {(item['route'], item['method'], item['status']) for item in snapshot}
+
+    assert ('/success', 'POST', web_exceptions.HTTPOk.status_code) in keys
+    assert ('/not_found', 'POST', web_exceptions.HTTPNotFound.status_code) in keys
+
+
+async def test_request_stats_unknown_method(api_client_test_app):
+    await api_client_test_app.request('FOOBAR', '/success')
+
+    snapshot = api_client_test_app.server.app['request_stats'].snapshot()
+    methods = {item['method'] for item in snapshot}
+
+    assert methods == {'OTHER'}
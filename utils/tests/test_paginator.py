@@ -16,7 +16,7 @@ from aiopg.sa.result import ResultProxy
 from aiohttp import web
 
 from utils import exceptions as app_exceptions
-from utils.paginator import Paginator
+from utils.paginator import Paginator, _encode_cursor, _decode_cursor
 
 metadata = MetaData()
 
@@ -138,6 +138,14 @@ def test__convert_query_success_another_one(app, faker):
     assert query_res['filters']['int_data'] == query['int_data']
 
 
+def test__convert_query_validator_cached(app, faker):
+    Paginator._convert_query(table=pagination, raw_query={})
+    validator = Paginator._validators[pagination]
+
+    Paginator._convert_query(table=pagination, raw_query={'sequence': faker.word()})
+    assert Paginator._validators[pagination] is validator
+
+
 ########################################################
 # tests for get_count
 ########################################################
@@ -307,3 +315,178 @@ async def test_get_page_success(app, database, pagination_data):
         assert data.get_next_page() == paginator._pages_count
         assert data.get_prev_page() == paginator._pages_count - 1
         assert data[0]['id'] == 491
+
+
+########################################################
+# tests for cursor mode
+########################################################
+
+def test__decode_cursor_success(faker):
+    sort_value = faker.word()
+    pk_value = faker.random_int()
+    cursor = _encode_cursor(direction='next', sort_value=sort_value, pk_value=pk_value)
+
+    assert _decode_cursor(cursor) == ('next', sort_value, pk_value)
+
+
+def test__decode_cursor_fail(faker):
+    with pytest.raises(app_exceptions.ValidateDataError):
+        _decode_cursor(faker.word())
+
+    with pytest.raises(app_exceptions.ValidateDataError):
+        _decode_cursor(_encode_cursor(direction=faker.word(), sort_value=1, pk_value=1))
+
+
+########################################################
+
+
+async def test_get_cursor_page_success(app, database, pagination_data):
+    limit = 14
+    query = {'limit': limit}
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        paginator = Paginator(conn=conn, table=pagination, query=query,
+                              mode=Paginator.MODE_CURSOR)
+        data = await paginator.get_page()
+        assert len(data) == limit
+        assert data[0]['id'] == 1
+        assert data.has_next() is True
+        assert data.has_prev() is False
+        assert data.prev_cursor is None
+
+        data = await paginator.get_page(cursor=data.next_cursor)
+        assert len(data) == limit
+        assert data[0]['id'] == limit + 1
+        assert data.has_prev() is True
+
+        data = await paginator.get_page(cursor=data.prev_cursor)
+        assert len(data) == limit
+        assert data[0]['id'] == 1
+        assert data.has_prev() is False
+
+        # pages have no numbers in cursor mode
+        assert data.get_next_page() is None
+        assert data.get_prev_page() is None
+
+
+async def test_get_cursor_page_walk_all(app, database, pagination_data):
+    limit = 14
+    query = {'limit': limit, 'sort_by': 'sequence', 'order_by': 'desc'}
+    ids = set()
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        paginator = Paginator(conn=conn, table=pagination, query=query,
+                              mode=Paginator.MODE_CURSOR)
+        data = await paginator.get_page()
+        ids.update(record['id'] for record in data)
+        while data.has_next():
+            data = await paginator.get_page(cursor=data.next_cursor)
+            ids.update(record['id'] for record in data)
+
+    assert len(ids) == COUNT_DATA
+    assert data.to_dict()['next_cursor'] is None
+
+
+########################################################
+# tests for count strategies
+########################################################
+
+async def test_count_strategy_exact(app, database, pagination_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        paginator = Paginator(conn=conn, table=pagination)
+        data = await paginator.get_page()
+
+    assert paginator.count_source == Paginator.COUNT_EXACT
+    assert data.to_dict()['count_source'] == Paginator.COUNT_EXACT
+
+
+async def test_count_strategy_cached(app, database, pagination_data):
+    query = {'sequence': 'sequence_1'}
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        Paginator._count_cache.clear()
+        paginator = Paginator(conn=conn, table=pagination, query=dict(query),
+                              count_strategy=Paginator.COUNT_CACHED)
+        await paginator._calculate()
+        assert paginator.count_source == Paginator.COUNT_EXACT
+        assert paginator.records_count == 111
+
+        paginator = Paginator(conn=conn, table=pagination, query=dict(query),
+                              count_strategy=Paginator.COUNT_CACHED)
+        await paginator._calculate()
+        assert paginator.count_source == Paginator.COUNT_CACHED
+        assert paginator.records_count == 111
+
+
+async def test_count_strategy_estimate(app, database, pagination_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        await conn.execute(f'ANALYZE {pagination.name}')
+
+        paginator = Paginator(conn=conn, table=pagination,
+                              count_strategy=Paginator.COUNT_ESTIMATE)
+        await paginator._calculate()
+        assert paginator.count_source == Paginator.COUNT_ESTIMATE
+        assert paginator.records_count > 0
+
+        paginator = Paginator(conn=conn, table=pagination, query={'sequence': 'sequence_1'},
+                              count_strategy=Paginator.COUNT_ESTIMATE)
+        await paginator._calculate()
+        assert paginator.count_source == Paginator.COUNT_ESTIMATE
+
+
+async def test_count_strategy_estimate_never_analyzed(app, database, pagination_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        # new table has not been analyzed, planner knows nothing about it
+        paginator = Paginator(conn=conn, table=pagination,
+                              count_strategy=Paginator.COUNT_ESTIMATE)
+        await paginator._calculate()
+        assert paginator.count_source == Paginator.COUNT_EXACT
+        assert paginator.records_count == COUNT_DATA
+
+
+async def test_count_strategy_estimate_page_is_not_clamped(app, database, pagination_data):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        await conn.execute(f'ANALYZE {pagination.name}')
+
+        paginator = Paginator(conn=conn, table=pagination,
+                              count_strategy=Paginator.COUNT_ESTIMATE)
+        await paginator._calculate()
+        # estimate could be less than real count
+        number = paginator.pages_count + 5
+        assert paginator._validate_page_number(number=number) == number
+
+
+async def test_count_strategy_window(app, database, pagination_data):
+    limit = 14
+    query = {'limit': limit}
+
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        paginator = Paginator(conn=conn, table=pagination, query=query,
+                              count_strategy=Paginator.COUNT_WINDOW)
+        data = await paginator.get_page(page=2)
+        assert paginator.count_source == Paginator.COUNT_WINDOW
+        assert paginator.records_count == COUNT_DATA
+        assert paginator.pages_count == ceil(COUNT_DATA / limit)
+        assert len(data) == limit
+        assert data[0]['id'] == limit + 1
+        assert '_total_count' not in data[0]
+        assert type(data[0]) is dict
+
+        # page is past the end, the last page has to be returned
+        data = await paginator.get_page(page=paginator.pages_count + 10)
+        assert data.page == paginator.pages_count
+        assert paginator.records_count == COUNT_DATA
+        assert data[0]['id'] == 491
+
+
+@pytest.mark.parametrize('count_strategy', [Paginator.COUNT_EXACT, Paginator.COUNT_CACHED,
+                                            Paginator.COUNT_ESTIMATE, Paginator.COUNT_WINDOW])
+async def test_records_are_dicts(app, database, pagination_data, count_strategy):
+    async with app['db'].acquire() as conn:  # type: SAConnection
+        paginator = Paginator(conn=conn, table=pagination, count_strategy=count_strategy)
+        data = await paginator.get_page(page=1)
+        assert all(type(record) is dict for record in data)
+
+        paginator = Paginator(conn=conn, table=pagination, mode=Paginator.MODE_CURSOR)
+        data = await paginator.get_page()
+        assert all(type(record) is dict for record in data)
@@ -8,9 +8,15 @@
 
 import time
 
-from utils.timestamp import get_current_timestamp
+from utils.timestamp import get_current_timestamp, get_current_datetime
 
 
 def test_get_current_timestamp():
     current_time = int(time.time())
     assert current_time == get_current_timestamp()
+
+
+def test_get_current_datetime():
+    current_datetime = get_current_datetime()
+    assert current_datetime.tzinfo is not None
+    assert abs(current_datetime.timestamp() - time.time()) < 1
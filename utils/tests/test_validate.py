@@ -9,7 +9,8 @@
 import pytest
 import trafaret as t
 
-from utils.validate import validate, validate_schema
+from utils.validate import validate, validate_schema, SchemaValidator, \
+    register_schema, get_schema_validator
 from utils import exceptions as app_exceptions
 
 
@@ -105,3 +106,35 @@ def test_validate_schema_nested_errors(faker):
         vvv = ex
         import pdb
         pdb.set_trace()
+
+
+########################################################
+
+
+def test_schema_validator_success(faker):
+    validator = SchemaValidator(_json_schema)
+
+    assert validator.is_valid({'firstName': faker.word()})
+    validator.validate({'firstName': faker.word()})
+    validate_schema(validator=validator, data={'firstName': faker.word()})
+
+
+def test_schema_validator_fail(faker):
+    validator = SchemaValidator(_json_schema_nested)
+
+    with pytest.raises(app_exceptions.ValidateDataError) as exc_info:
+        validator.validate({'nested': {}})
+
+    assert 'firstName' in exc_info.value.detail
+    assert 'test_for_nested' in exc_info.value.detail['nested']
+
+
+def test_register_schema(faker):
+    name = faker.uuid4()
+    validator = register_schema(name=name, jsonschema=_json_schema)
+
+    assert register_schema(name=name, jsonschema=_json_schema) is validator
+    assert get_schema_validator(name) is validator
+
+    with pytest.raises(KeyError):
+        get_schema_validator(faker.uuid4())
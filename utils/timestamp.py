@@ -7,6 +7,7 @@
 """
 
 import time
+from datetime import datetime, timezone
 
 
 def get_current_timestamp() -> int:
@@ -15,3 +16,11 @@ def get_current_timestamp() -> int:
     :return:
     """
     return int(time.time())
+
+
+def get_current_datetime() -> datetime:
+    """
+    Return current time as timezone aware (UTC) datetime
+    :return:
+    """
+    return datetime.now(timezone.utc)
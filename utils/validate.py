@@ -7,7 +7,7 @@
 """
 
 import trafaret as t
-from typing import Any
+from typing import Any, Optional
 from collections import defaultdict
 from jsonschema import Draft7Validator
 from trafaret.base import Dict
@@ -15,22 +15,14 @@ from trafaret.base import Dict
 from utils import exceptions as app_exceptions
 
 
-def validate_schema(*,
-                    jsonschema: dict,
-                    data: Any
-                    ) -> None:
+def _collect_errors(validator: Draft7Validator, data: Any) -> dict:
     """
-    Checks data with jsonschema
+    Walk through all errors of data and group them by fields
 
-    :param jsonschema: jsonschema
+    :param validator: jsonschema validator
     :param data: data for check
-    :return:
+    :return: dict with errors, empty if data is valid
     """
-    # from typing import TYPE_CHECKING
-    # if not TYPE_CHECKING:
-    # otherwise mypy raises error
-    # return
-
     _errors: defaultdict = defaultdict(list)
 
     def set_nested_item(data_dict, path, key, val):  # type: ignore
@@ -41,7 +33,7 @@ def validate_schema(*,
         data_dict.setdefault(key, list())
         data_dict[key].append(val)
 
-    for err in Draft7Validator(schema=jsonschema).iter_errors(instance=data):
+    for err in validator.iter_errors(instance=data):
         path = err.schema_path
 
         if "properties" in path:
@@ -55,8 +47,104 @@ def validate_schema(*,
 
         set_nested_item(_errors, err.relative_path, key, err.message)
 
+    return dict(_errors)
+
+
+########################################################
+
+
+class SchemaValidator:
+    """
+    Precompiled jsonschema.
+    Schema is checked once on creation, object is reused for each validation
+    """
+
+    def __init__(self, jsonschema: dict) -> None:
+        """
+        :param jsonschema: jsonschema
+        :raise jsonschema.SchemaError: if schema itself is invalid
+        """
+        Draft7Validator.check_schema(jsonschema)
+        self._validator = Draft7Validator(schema=jsonschema)
+
+    @property
+    def schema(self) -> dict:
+        return self._validator.schema
+
+    def is_valid(self, data: Any) -> bool:
+        return self._validator.is_valid(data)
+
+    def validate(self, data: Any) -> None:
+        """
+        Checks data. Errors are collected only if data is invalid
+
+        :param data: data for check
+        :raise ValidateDataError: with errors grouped by fields
+        """
+        if self._validator.is_valid(data):
+            return
+
+        raise app_exceptions.ValidateDataError(_collect_errors(self._validator, data))
+
+
+_registry: dict = {}
+
+
+def register_schema(*, name: str, jsonschema: dict) -> SchemaValidator:
+    """
+    Compile schema and save it in registry under the name.
+    If name has already been registered returns existing validator
+
+    :param name: unique name of schema
+    :param jsonschema: jsonschema
+    :return: validator
+    """
+    try:
+        return _registry[name]
+    except KeyError:
+        pass
+
+    validator = SchemaValidator(jsonschema)
+    _registry[name] = validator
+    return validator
+
+
+def get_schema_validator(name: str) -> SchemaValidator:
+    """
+    Returns validator registered by register_schema
+
+    :param name: name of schema
+    :raise KeyError: if schema has not been registered
+    """
+    return _registry[name]
+
+
+########################################################
+
+
+def validate_schema(*,
+                    jsonschema: Optional[dict] = None,
+                    data: Any,
+                    validator: Optional[SchemaValidator] = None
+                    ) -> None:
+    """
+    Checks data with jsonschema.
+    For hot paths prefer precompiled validator (see register_schema)
+
+    :param jsonschema: jsonschema
+    :param data: data for check
+    :param validator: precompiled validator, used instead of jsonschema
+    :return:
+    """
+    if validator is not None:
+        validator.validate(data)
+        return
+
+    assert jsonschema is not None
+    _errors = _collect_errors(Draft7Validator(schema=jsonschema), data)
+
     if _errors:
-        raise app_exceptions.ValidateDataError(dict(_errors))
+        raise app_exceptions.ValidateDataError(_errors)
 
 
 def validate(*,